@@ -1,53 +1,10 @@
 from pyMaze import maze,agent,COLOR,textLabel
-from queue import PriorityQueue
-def h(cell1, cell2):
-    x1, y1 = cell1
-    x2, y2 = cell2
-    return (abs(x1 - x2) + abs(y1 - y2))
-    
-def aStar(m,start=None):
-    if start is None:
-        start=(m.rows,m.cols)
-    open = PriorityQueue()
-    open.put((h(start, m._goal), h(start, m._goal), start))
-    aPath = {}
-    g_score = {row: float("inf") for row in m.grid}
-    g_score[start] = 0
-    f_score = {row: float("inf") for row in m.grid}
-    f_score[start] = h(start, m._goal)
-    searchPath=[start]
-    while not open.empty():
-        currCell = open.get()[2]
-        searchPath.append(currCell)
-        if currCell == m._goal:
-            break        
-        for d in 'ESNW':
-            if m.maze_map[currCell][d]==True:
-                if d=='E':
-                    childCell=(currCell[0],currCell[1]+1)
-                elif d=='W':
-                    childCell=(currCell[0],currCell[1]-1)
-                elif d=='N':
-                    childCell=(currCell[0]-1,currCell[1])
-                elif d=='S':
-                    childCell=(currCell[0]+1,currCell[1])
-
-                temp_g_score = g_score[currCell] + 1
-                temp_f_score = temp_g_score + h(childCell, m._goal)
-
-                if temp_f_score < f_score[childCell]:   
-                    aPath[childCell] = currCell
-                    g_score[childCell] = temp_g_score
-                    f_score[childCell] = temp_g_score + h(childCell, m._goal)
-                    open.put((f_score[childCell], h(childCell, m._goal), childCell))
+from mazeSolver import solverOf
 
-
-    fwdPath={}
-    cell=m._goal
-    while cell!=start:
-        fwdPath[aPath[cell]]=cell
-        cell=aPath[cell]
-    return searchPath,aPath,fwdPath
+def aStar(m,start=None):
+    s=solverOf(m)
+    fwdPath=s.aStar(start)
+    return s.searchPath,s.searchTree,fwdPath
 
 if __name__=='__main__':
     m=maze(4,4)
@@ -1,40 +1,8 @@
 from pyMaze import maze, COLOR, agent
+from mazeSolver import solverOf
 
 def DFS(m):
-    start = (m.rows, m.cols)
-    explored = [start]
-    frontier = [start]
-    dfsPath = {}
-
-    while frontier:
-        currCell = frontier.pop()
-        if currCell == (1, 1):
-            break
-        for direction in m.maze_map[currCell]:
-            if m.maze_map[currCell][direction] == 1:
-                if direction == 'N':
-                    childCell = (currCell[0] - 1, currCell[1])
-                elif direction == 'S':
-                    childCell = (currCell[0] + 1, currCell[1])
-                elif direction == 'E':
-                    childCell = (currCell[0], currCell[1] + 1)
-                elif direction == 'W':
-                    childCell = (currCell[0], currCell[1] - 1)
-                if childCell not in explored:
-                    explored.append(childCell)
-                    frontier.append(childCell)
-                    dfsPath[childCell] = currCell
-
-    if (1, 1) not in dfsPath:
-        return {}
-
-    fwdPath = {}
-    cell = (1, 1)
-    while cell != start:
-        fwdPath[dfsPath[cell]] = cell
-        cell = dfsPath[cell]
-    return fwdPath
-
+    return solverOf(m).dfs((m.rows, m.cols), (1, 1))
 
 
 m = maze(10,10)
@@ -0,0 +1,173 @@
+import os,sys,json,struct,zipfile,argparse,ast
+from array import array
+from multiprocessing import Pool
+from pyMaze import maze,movePath
+from mazeGraph import junctionGraph
+
+# The shards are written in the .npz format of NumPy (np.savez_compressed),
+# so they load with np.load without NumPy being needed to write them.
+_NPY_MAGIC=b'\x93NUMPY\x01\x00'
+
+def _littleEndian(a):
+    '''
+    The bytes of the array a in little endian order (the '<' arrays of the shards)
+    '''
+    if sys.byteorder!='little':
+        a=array(a.typecode,a)
+        a.byteswap()
+    return a.tobytes()
+
+def _fromLittleEndian(typecode,data):
+    '''
+    Inverse of _littleEndian, an array of typecode from little endian bytes
+    '''
+    a=array(typecode,data)
+    if sys.byteorder!='little':
+        a.byteswap()
+    return a
+
+def _npy(data,descr,shape):
+    '''
+    The bytes of a .npy file (format 1.0) holding data, the raw bytes of an
+    array of type descr (like '|u1' or '<i8') and the given shape
+    '''
+    header=f"{{'descr': '{descr}', 'fortran_order': False, 'shape': {tuple(shape)!r}, }}"
+    header+=' '*(-(len(_NPY_MAGIC)+2+len(header)+1)%64)+'\n'
+    return _NPY_MAGIC+struct.pack('<H',len(header))+header.encode('latin1')+bytes(data)
+
+def _readNpy(data):
+    '''
+    (descr,shape,raw bytes) of a .npy file written by _npy
+    '''
+    if data[:len(_NPY_MAGIC)]!=_NPY_MAGIC:
+        raise ValueError('Not a .npy file written by mazeDataset!')
+    size,=struct.unpack_from('<H',data,len(_NPY_MAGIC))
+    start=len(_NPY_MAGIC)+2
+    # literal_eval only reads Python literals, a header can never run code
+    try:
+        header=ast.literal_eval(data[start:start+size].decode('latin1'))
+        return header['descr'],tuple(header['shape']),data[start+size:]
+    except (ValueError,SyntaxError,TypeError,KeyError):
+        raise ValueError('Not a .npy file written by mazeDataset!')
+
+def _sample(rows,cols,goal,loopPercent,generator,solver,seed):
+    '''
+    Generate one maze and solve it from (rows,cols) to goal.
+    Returns the walls (one byte per cell) and the moves of the shortest path.
+    '''
+    m=maze(rows,cols,render=False)
+    m.CreateMaze(*goal,loopPercent=loopPercent,generator=generator,seed=seed)
+    if solver=='astar':
+        path=junctionGraph(m).shortestPath((rows,cols),goal)
+    else:
+        path=m.pathFrom((rows,cols))
+    return m._walls,path.moves
+
+def _makeShard(task):
+    '''
+    Worker of the pool: generate the samples of one shard and write the shard.
+    The shard is written to a temporary file and renamed when complete, so a
+    shard file either is complete or does not exist.
+    '''
+    filename,first,count,rows,cols,goal,loopPercent,generator,solver,seed=task
+    walls=bytearray()
+    moves=bytearray()
+    offsets=array('q',[0])
+    seeds=array('q')
+    for n in range(first,first+count):
+        w,p=_sample(rows,cols,goal,loopPercent,generator,solver,seed+n)
+        walls+=w
+        moves+=p.encode('ascii')
+        offsets.append(len(moves))
+        seeds.append(seed+n)
+    lengths=array('i',(offsets[k+1]-offsets[k] for k in range(count)))
+    tmp=f'{filename}.{os.getpid()}.tmp'
+    with zipfile.ZipFile(tmp,'w',zipfile.ZIP_DEFLATED) as z:
+        z.writestr('walls.npy',_npy(walls,'|u1',(count,rows,cols)))
+        z.writestr('moves.npy',_npy(moves,'|u1',(len(moves),)))
+        z.writestr('offsets.npy',_npy(_littleEndian(offsets),'<i8',(count+1,)))
+        z.writestr('seeds.npy',_npy(_littleEndian(seeds),'<i8',(count,)))
+        z.writestr('lengths.npy',_npy(_littleEndian(lengths),'<i4',(count,)))
+    os.replace(tmp,filename)
+    return filename
+
+def writeDataset(directory,count,rows,cols,shardSize=1000,goal=(1,1),loopPercent=0,generator='backtracker',solver='bfs',seed=0,processes=None):
+    '''
+    Generate count mazes with their shortest paths and write them as shards
+    (.npz files, np.load can read them) in directory, over a pool of processes.
+    Each shard is made and written by one worker, so the memory used does not
+    grow with count. Sample n is generated with the seed seed+n, so the dataset
+    is the same whatever the number of processes.
+    Writing can be stopped and started again with the same arguments: the
+    shards already written are kept and only the missing ones are made.
+    Every shard holds, for its k samples:
+    walls-->    uint8 (k,rows,cols), the wall bits of the cells (E=1,W=2,N=4,S=8
+                set for the open sides, see maze._walls)
+    moves-->    uint8, the moves of all the paths one after the other, as the
+                ASCII codes of 'E','W','N','S' (see movePath)
+    offsets-->  int64 (k+1,), the path of sample i is moves[offsets[i]:offsets[i+1]]
+    seeds-->    int64 (k,), the seed of every sample
+    lengths-->  int32 (k,), the length of every path
+    The arguments are also written to manifest.json in directory.
+    solver-->   'bfs' (the distance field of the maze) or 'astar' (A* over the
+                junction graph), both give a shortest path from (rows,cols) to goal
+    processes-->    Number of worker processes (default is the number of CPUs)
+    Returns the list of the shard files.
+    '''
+    if solver not in ('bfs','astar'):
+        raise ValueError(f'{solver} is not a valid solver!')
+    if generator not in ('backtracker','kruskal','wilson'):
+        raise ValueError(f'{generator} is not a valid maze generator!')
+    os.makedirs(directory,exist_ok=True)
+    manifest={'count':count,'rows':rows,'cols':cols,'shardSize':shardSize,'goal':list(goal),
+              'loopPercent':loopPercent,'generator':generator,'solver':solver,'seed':seed}
+    manifestFile=os.path.join(directory,'manifest.json')
+    if os.path.exists(manifestFile):
+        with open(manifestFile) as f:
+            if json.load(f)!=manifest:
+                raise ValueError(f'{directory} holds a dataset made with other arguments!')
+    else:
+        with open(manifestFile,'w') as f:
+            json.dump(manifest,f,indent=1)
+    shards=[os.path.join(directory,f'shard-{k:05d}.npz') for k in range(-(-count//shardSize))]
+    tasks=[(filename,k*shardSize,min(shardSize,count-k*shardSize),rows,cols,tuple(goal),loopPercent,generator,solver,seed)
+           for k,filename in enumerate(shards) if not os.path.exists(filename)]
+    if tasks:
+        with Pool(processes) as pool:
+            for filename in pool.imap_unordered(_makeShard,tasks):
+                pass
+    return shards
+
+def readShard(filename):
+    '''
+    Iterate over the samples of a shard without NumPy.
+    Yields (seed,walls,path) with walls the bytes of the wall bits of the
+    cells (flat index order) and path the movePath from (rows,cols) to the goal.
+    '''
+    with zipfile.ZipFile(filename) as z:
+        arrays={name[:-4]:_readNpy(z.read(name)) for name in z.namelist()}
+    _,(count,rows,cols),walls=arrays['walls']
+    moves=arrays['moves'][2].decode('ascii')
+    offsets=_fromLittleEndian('q',arrays['offsets'][2])
+    seeds=_fromLittleEndian('q',arrays['seeds'][2])
+    n=rows*cols
+    for k in range(count):
+        yield seeds[k],walls[k*n:(k+1)*n],movePath((rows,cols),moves[offsets[k]:offsets[k+1]])
+
+if __name__=='__main__':
+    parser=argparse.ArgumentParser(description='Write a dataset of mazes and their shortest paths')
+    parser.add_argument('directory')
+    parser.add_argument('count',type=int)
+    parser.add_argument('rows',type=int)
+    parser.add_argument('cols',type=int)
+    parser.add_argument('--shard-size',type=int,default=1000)
+    parser.add_argument('--loop-percent',type=int,default=0)
+    parser.add_argument('--generator',default='backtracker')
+    parser.add_argument('--solver',default='bfs')
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--processes',type=int)
+    args=parser.parse_args()
+    shards=writeDataset(args.directory,args.count,args.rows,args.cols,args.shard_size,
+                        loopPercent=args.loop_percent,generator=args.generator,solver=args.solver,
+                        seed=args.seed,processes=args.processes)
+    print(f'{len(shards)} shards in {args.directory}')
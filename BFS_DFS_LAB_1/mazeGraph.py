@@ -0,0 +1,240 @@
+from pyMaze import maze,movePath
+from heapq import heappush,heappop
+from array import array
+
+# Wall bits of pyMaze (E=1,W=2,N=4,S=8): names of the directions and of their
+# opposites, and tables counting the E and S bits of a cell
+_NAME={1:'E',2:'W',4:'N',8:'S'}
+_BACK={1:'W',2:'E',4:'S',8:'N'}
+_EAST_SOUTH=bytes((b&1)+(b>>3&1) for b in range(256))
+_EAST=bytes(b&1 for b in range(256))
+_SOUTH=bytes(b>>3&1 for b in range(256))
+
+class junctionGraph:
+    '''
+    A maze compiled into a weighted graph of its junctions.
+    Most cells of a maze are corridor cells with exactly two open sides. They are
+    collapsed away and only the junctions, dead ends (cells with other than two
+    open sides) and the cells given in keep become nodes. Each edge is a corridor,
+    weighted by its length in steps.
+    Only the first direction of every corridor is stored, the cells of a corridor
+    are found again by walking it, so the graph takes memory proportional to the
+    number of junctions and not to the number of cells.
+    '''
+    def __init__(self,m:maze,keep=None):
+        '''
+        m-->    The maze to compile
+        keep--> Cells that must be nodes, for example the start and goal of
+                the searches. Default is (rows,cols) and the goal of the maze.
+        adj-->  You don't need to pass this
+                Dictionary with the flat index of every node as keys and a list
+                of (other node,length,first direction) as values
+        expansions--> Number of nodes expanded by the last shortestPath
+        '''
+        self._maze=m
+        self.cols=m.cols
+        if keep is None:
+            keep=[(m.rows,m.cols),getattr(m,'_goal',(1,1))]
+        nodes=set(m.toIndex(*cell) for cell in keep)
+        for i in range(m.rows*m.cols):
+            if len(m.neighbors(i))!=2:
+                nodes.add(i)
+        self.adj={i:[] for i in nodes}
+        self.expansions=0
+        for u in nodes:
+            for v in m.neighbors(u):
+                end,length=self._walk(u,v)
+                self.adj[u].append((end,length,v-u))
+
+    def _walk(self,u,v):
+        '''
+        Follow the corridor leaving node u through its neighbour v.
+        Returns the node at the other end and the length of the corridor.
+        '''
+        prev,cur=u,v
+        length=1
+        while cur not in self.adj:
+            n=self._maze.neighbors(cur)
+            nxt=n[0] if n[0]!=prev else n[1]
+            prev,cur=cur,nxt
+            length+=1
+        return cur,length
+
+    def _expand(self,u,step,moves):
+        '''
+        Add the moves (E,W,N,S) of the corridor leaving node u with the step
+        (index offset) to the list moves
+        '''
+        cols=self.cols
+        name={1:'E',-1:'W',cols:'S',-cols:'N'}
+        prev,cur=u,u+step
+        moves.append(name[step])
+        while cur not in self.adj:
+            n=self._maze.neighbors(cur)
+            nxt=n[0] if n[0]!=prev else n[1]
+            moves.append(name[nxt-cur])
+            prev,cur=cur,nxt
+        return cur
+
+    @property
+    def nodes(self):
+        '''
+        Number of nodes of the graph
+        '''
+        return len(self.adj)
+
+    def shortestPath(self,start,goal):
+        '''
+        A* search over the junction graph (Manhattan distance never overestimates
+        a corridor length, so the result is a shortest path).
+        Returns the path from start to goal as a movePath (a mapping of cells
+        {cell:next cell} like maze.path), or None if goal cannot be reached.
+        start and goal must be nodes of the graph (see keep).
+        '''
+        m=self._maze
+        cols=self.cols
+        s=m.toIndex(*start)
+        g=m.toIndex(*goal)
+        for cell,i in ((start,s),(goal,g)):
+            if i not in self.adj:
+                raise ValueError(f'{cell} is not a node of the junction graph, add it to keep!')
+        gr,gc=divmod(g,cols)
+        def h(i):
+            r,c=divmod(i,cols)
+            return abs(r-gr)+abs(c-gc)
+        best={s:0}
+        came={}
+        open=[(h(s),0,s)]
+        self.expansions=0
+        while open:
+            f,d,u=heappop(open)
+            if d>best[u]:
+                continue
+            self.expansions+=1
+            if u==g:
+                break
+            for v,length,step in self.adj[u]:
+                nd=d+length
+                if nd<best.get(v,float('inf')):
+                    best[v]=nd
+                    came[v]=(u,step)
+                    heappush(open,(nd+h(v),nd,v))
+        if g not in best:
+            return None
+        route=[]
+        v=g
+        while v!=s:
+            u,step=came[v]
+            route.append((u,step))
+            v=u
+        moves=[]
+        for u,step in reversed(route):
+            self._expand(u,step,moves)
+        return movePath(start,''.join(moves))
+
+class mazeTree:
+    '''
+    Path queries between any two cells of a perfect maze (no loops).
+    A perfect maze is a tree, so the path between two cells goes up from both
+    to their lowest common ancestor (LCA). The tree is rooted at the goal, with
+    the parent and depth of every cell taken from the distance field, and the
+    LCA is found by binary lifting: the ancestor 2**k levels up of every cell is
+    kept for every k, which takes O(n log n) memory and time to build.
+    distance is O(log n) and path is O(log n + length of the path).
+    '''
+    def __init__(self,m:maze):
+        '''
+        m-->    The maze, it must be a perfect maze
+        depth-->    You don't need to pass this
+                    Array of the distance of every cell (flat index) to the goal
+        up--> You don't need to pass this
+              up[k][i] is the ancestor of the cell i 2**k levels up (the goal
+              is its own ancestor)
+        '''
+        self._maze=m
+        self.cols=cols=m.cols
+        n=m.rows*cols
+        dist,toGoal=m.distanceField()
+        if dist.count(-1) or self._edges(m)!=n-1:
+            raise ValueError('The maze is not a perfect maze, it has loops or closed off cells!')
+        self.depth=array('i',dist)
+        self._toGoal=bytes(toGoal)
+        step={0:0,1:1,2:-1,8:cols,4:-cols} # E,W,S,N bits of pyMaze
+        parent=array('i',(i+step[t] for i,t in enumerate(toGoal)))
+        self.up=[parent]
+        height=max(self.depth)
+        while 1<<len(self.up)<=height:
+            prev=self.up[-1]
+            self.up.append(array('i',map(prev.__getitem__,prev)))
+
+    @staticmethod
+    def _edges(m):
+        '''
+        Number of open walls between two cells of the maze
+        '''
+        rows,cols=m.rows,m.cols
+        n=rows*cols
+        w=m._walls
+        if not isinstance(w,(bytes,bytearray)):
+            w=bytes(w[i] for i in range(n))
+        # E (1) and S (8) bits, without the outer walls of the last column and row
+        edges=sum(w.translate(_EAST_SOUTH))
+        edges-=sum(w[cols-1::cols].translate(_EAST))
+        edges-=sum(w[n-cols:].translate(_SOUTH))
+        return edges
+
+    def _lca(self,a,b):
+        '''
+        Lowest common ancestor of the cells a and b (flat indices)
+        '''
+        depth,up=self.depth,self.up
+        if depth[a]<depth[b]:
+            a,b=b,a
+        diff=depth[a]-depth[b]
+        k=0
+        while diff:
+            if diff&1:
+                a=up[k][a]
+            diff>>=1
+            k+=1
+        if a==b:
+            return a
+        for k in range(len(up)-1,-1,-1):
+            if up[k][a]!=up[k][b]:
+                a=up[k][a]
+                b=up[k][b]
+        return up[0][a]
+
+    def lca(self,a,b):
+        '''
+        The cell where the paths from a and from b to the goal meet
+        '''
+        m=self._maze
+        return m.toCell(self._lca(m.toIndex(*a),m.toIndex(*b)))
+
+    def distance(self,a,b):
+        '''
+        Length of the path between the cells a and b
+        '''
+        m=self._maze
+        i,j=m.toIndex(*a),m.toIndex(*b)
+        return self.depth[i]+self.depth[j]-2*self.depth[self._lca(i,j)]
+
+    def path(self,a,b):
+        '''
+        The path from the cell a to the cell b, as a movePath
+        '''
+        m=self._maze
+        i,j=m.toIndex(*a),m.toIndex(*b)
+        top=self._lca(i,j)
+        parent,toGoal=self.up[0],self._toGoal
+        moves=[]
+        while i!=top:
+            moves.append(_NAME[toGoal[i]])
+            i=parent[i]
+        down=[]
+        while j!=top:
+            down.append(_BACK[toGoal[j]])
+            j=parent[j]
+        moves.extend(reversed(down))
+        return movePath(a,''.join(moves))
@@ -0,0 +1,232 @@
+from pyMaze import maze
+from collections import deque
+from heapq import heappush,heappop
+from array import array
+
+class mazeSolver:
+    '''
+    BFS, DFS, A* and Dijkstra over one maze, sharing a neighbour table built
+    once. The table is in CSR form: the neighbours of the cell i (flat index)
+    are targets[offsets[i]:offsets[i+1]], in E,W,N,S order like maze.neighbors.
+    The searches work on flat indices with array bookkeeping instead of lists
+    and dictionaries of cells, so BFS and DFS are linear time and A* and
+    Dijkstra O(n log n).
+    The arrays are allocated once and reused by every search: each search has
+    a new generation number and an entry only counts if its stamp is the
+    current generation, so nothing is cleared between searches and a search
+    costs only the cells it reaches. Keep one solver for many queries.
+    The table is a snapshot of the walls, make a new solver after changing them
+    (solverOf does that for you).
+    '''
+    def __init__(self,m:maze):
+        '''
+        m-->    The maze to solve
+        offsets,targets-->  You don't need to pass this
+                            The neighbour table
+        searchOrder-->  You don't need to pass this
+                        Flat indices of the cells in the order the last search
+                        expanded them (see searchPath)
+        parent-->   You don't need to pass this
+                    Array of the cell each cell was reached from, only valid
+                    for the cells reached by the last search (see searchTree)
+        _reached,_closed,_best,_generation-->   You don't need to pass this
+                    Generation stamps of the cells reached and expanded, the
+                    best known distance from start, and the current generation
+        _wallVersion--> You don't need to pass this
+                        The wall version of the maze the table was built from
+        '''
+        self._maze=m
+        self._wallVersion=m._wallVersion
+        self.rows,self.cols=m.rows,m.cols
+        n=m.rows*m.cols
+        self.offsets=array('i',[0])
+        self.targets=array('i')
+        for i in range(n):
+            self.targets.extend(m.neighbors(i))
+            self.offsets.append(len(self.targets))
+        self.searchOrder=array('i')
+        self.parent=array('i',[-1])*n
+        self._best=array('i',[0])*n
+        self._reached=array('I',[0])*n
+        self._closed=array('I',[0])*n
+        self._generation=0
+        self._start=None
+
+    def _ends(self,start,goal):
+        '''
+        Flat indices of start (default (rows,cols)) and goal (default the maze goal)
+        '''
+        m=self._maze
+        if start is None:
+            start=(self.rows,self.cols)
+        if goal is None:
+            goal=getattr(m,'_goal',(1,1))
+        for cell in (start,goal):
+            if cell not in m.grid:
+                raise ValueError(f'{cell} is not a cell of the maze!')
+        return m.toIndex(*start),m.toIndex(*goal)
+
+    def _fwdPath(self,s,g):
+        '''
+        The path found by the last search from s to g, in the fwdPath form
+        {cell:next cell} of the lab solvers (empty if g was not reached)
+        '''
+        parent=self.parent
+        toCell=self._maze.toCell
+        if self._reached[g]!=self._generation:
+            return {}
+        cells=[g]
+        while cells[-1]!=s:
+            cells.append(parent[cells[-1]])
+        return {toCell(cells[k]):toCell(cells[k-1]) for k in range(len(cells)-1,0,-1)}
+
+    def _reset(self,s):
+        '''
+        Start a new search from s: a new generation, s reached at distance 0
+        '''
+        self._generation+=1
+        if self._generation==2**32:
+            # The stamps would wrap around, clear them once
+            n=self.rows*self.cols
+            self._reached=array('I',[0])*n
+            self._closed=array('I',[0])*n
+            self._generation=1
+        self.searchOrder=array('i')
+        self._start=s
+        self._reached[s]=self._generation
+        self._best[s]=0
+        self.parent[s]=-1
+        return self._generation
+
+    def bfs(self,start=None,goal=None):
+        '''
+        Breadth First Search, a shortest path from start to goal as fwdPath
+        '''
+        s,g=self._ends(start,goal)
+        gen=self._reset(s)
+        offsets,targets,parent,order=self.offsets,self.targets,self.parent,self.searchOrder
+        reached=self._reached
+        frontier=deque([s])
+        while frontier:
+            u=frontier.popleft()
+            order.append(u)
+            if u==g:
+                break
+            for k in range(offsets[u],offsets[u+1]):
+                v=targets[k]
+                if reached[v]!=gen:
+                    reached[v]=gen
+                    parent[v]=u
+                    frontier.append(v)
+        return self._fwdPath(s,g)
+
+    def dfs(self,start=None,goal=None):
+        '''
+        Depth First Search, a path (not always the shortest) from start to goal
+        as fwdPath. Cells are marked when they are pushed, like the lab DFS.
+        '''
+        s,g=self._ends(start,goal)
+        gen=self._reset(s)
+        offsets,targets,parent,order=self.offsets,self.targets,self.parent,self.searchOrder
+        reached=self._reached
+        frontier=[s]
+        while frontier:
+            u=frontier.pop()
+            order.append(u)
+            if u==g:
+                break
+            for k in range(offsets[u],offsets[u+1]):
+                v=targets[k]
+                if reached[v]!=gen:
+                    reached[v]=gen
+                    parent[v]=u
+                    frontier.append(v)
+        return self._fwdPath(s,g)
+
+    def _bestFirst(self,s,g,heuristic):
+        '''
+        The core of A* and Dijkstra: best first search with a plain list heap
+        of (f score,h score,cell). A cell is pushed again when a shorter way to
+        it is found, and the outdated entries are skipped when they are popped
+        (lazy deletion), since the cell is already expanded by then.
+        '''
+        gen=self._reset(s)
+        offsets,targets,parent,order=self.offsets,self.targets,self.parent,self.searchOrder
+        reached,closed,best=self._reached,self._closed,self._best
+        cols=self.cols
+        gr,gc=divmod(g,cols)
+        def h(i):
+            if not heuristic:
+                return 0
+            r,c=divmod(i,cols)
+            return abs(r-gr)+abs(c-gc)
+        open=[(h(s),h(s),s)]
+        while open:
+            f,hs,u=heappop(open)
+            if closed[u]==gen:
+                continue
+            closed[u]=gen
+            order.append(u)
+            if u==g:
+                break
+            d=best[u]+1
+            for k in range(offsets[u],offsets[u+1]):
+                v=targets[k]
+                if closed[v]!=gen and (reached[v]!=gen or d<best[v]):
+                    reached[v]=gen
+                    best[v]=d
+                    parent[v]=u
+                    hv=h(v)
+                    heappush(open,(d+hv,hv,v))
+        return self._fwdPath(s,g)
+
+    def aStar(self,start=None,goal=None):
+        '''
+        A* search with the Manhattan distance, a shortest path as fwdPath
+        '''
+        return self._bestFirst(*self._ends(start,goal),True)
+
+    def dijkstra(self,start=None,goal=None):
+        '''
+        Dijkstra's algorithm (every step costs 1), a shortest path as fwdPath
+        '''
+        return self._bestFirst(*self._ends(start,goal),False)
+
+    @property
+    def searchPath(self):
+        '''
+        Cells in the order the last search expanded them (for tracePath)
+        '''
+        toCell=self._maze.toCell
+        return [toCell(i) for i in self.searchOrder]
+
+    @property
+    def searchTree(self):
+        '''
+        {cell:cell it was reached from} of the last search, like the aPath
+        of the lab A*. Every reached cell has an expanded cell as parent, so
+        only the neighbours of the expanded cells are looked at.
+        '''
+        toCell=self._maze.toCell
+        offsets,targets,parent=self.offsets,self.targets,self.parent
+        gen,reached=self._generation,self._reached
+        tree={}
+        for u in self.searchOrder:
+            for k in range(offsets[u],offsets[u+1]):
+                v=targets[k]
+                if reached[v]==gen and parent[v]==u:
+                    tree[toCell(v)]=toCell(u)
+        return tree
+
+def solverOf(m:maze):
+    '''
+    The mazeSolver of the maze m, kept on the maze and built again only when
+    its walls have changed, so the lab solvers (bfs, dfs, aStar) pay for the
+    neighbour table once per maze instead of once per query.
+    The solver is kept on the maze (and not in a dictionary keyed by the maze)
+    since it refers to the maze, which would then never be freed.
+    '''
+    s=m._solver
+    if s is None or s._wallVersion!=m._wallVersion:
+        s=m._solver=mazeSolver(m)
+    return s
@@ -1,8 +1,583 @@
 
-import random,datetime,csv,os
-from tkinter import *
+import random,datetime,csv,os,struct,mmap,hashlib,zlib,base64,math,re,itertools
+from array import array
+try:
+    from tkinter import *
+except ImportError: # Python built without Tk, only headless mazes (render=False) work
+    pass
 from enum import Enum
 from collections import deque
+from heapq import heappush,heappop
+from multiprocessing import Pool,shared_memory
+from collections.abc import Mapping,Sequence
+
+# Bits of a cell in the wall store. A set bit means that side of the cell is open.
+_E,_W,_N,_S=1,2,4,8
+_DIR_BIT={'E':_E,'W':_W,'N':_N,'S':_S}
+_OPPOSITE={_E:_W,_W:_E,_N:_S,_S:_N}
+_DIR_NAME={b:d for d,b in _DIR_BIT.items()}
+# Moves of a path string as (row,column) steps, and back
+_DIR_STEP={'E':(0,1),'W':(0,-1),'N':(-1,0),'S':(1,0)}
+_STEP_DIR={s:d for d,s in _DIR_STEP.items()}
+_NOT_MOVE=str.maketrans('','','EWNS')
+_RLE=re.compile(r'(?:\d*[EWNS])*')
+_RLE_RUN=re.compile(r'(\d*)([EWNS])')
+_RLE_MOVES=re.compile(r'E+|W+|N+|S+')
+# Directions (as bits) inside a bitmask of directions, in E,W,S,N order
+_DIR_BITS=[tuple(b for b in (_E,_W,_S,_N) if m&b) for m in range(16)]
+
+def _carveChoices(mask,keep=None):
+    '''
+    The unvisited directions of a cell in the order E,W,S,N (the order used by
+    the maze generation). keep='h' drops N and S when E or W is available
+    and keep='v' drops E and W when N or S is available.
+    '''
+    cell=[d for d in 'EWSN' if mask&_DIR_BIT[d]]
+    if keep=='h' and mask&(_E|_W):
+        cell=[d for d in cell if d in 'EW']
+    elif keep=='v' and mask&(_N|_S):
+        cell=[d for d in cell if d in 'NS']
+    return tuple(cell)
+_CARVE=[_carveChoices(m) for m in range(16)]
+_CARVE_H=[_carveChoices(m,'h') for m in range(16)]
+_CARVE_V=[_carveChoices(m,'v') for m in range(16)]
+
+# Binary maze file: a fixed header followed by the walls of all cells as packed
+# nibbles (flat index order, two cells per byte, even index in the low nibble).
+# Header: magic, version, flags, rows, cols, goal x, goal y, seed
+_BIN_MAGIC=b'PYMZ'
+_BIN_VERSION=1
+_BIN_HEADER=struct.Struct('<4sHHIIIIq')
+_BIN_HAS_SEED=1
+
+def _seedInt(seed):
+    '''
+    The seed as a signed 64-bit int, for the header of binary maze files.
+    Ints out of that range and seeds of other types are reduced to one with
+    sha1 of their repr.
+    '''
+    if isinstance(seed,int) and -2**63<=seed<2**63:
+        return seed
+    return int.from_bytes(hashlib.sha1(repr(seed).encode()).digest()[:8],'little',signed=True)
+
+def _seedRng(seed):
+    '''
+    The random generator for a seed: the module random for None, otherwise a
+    random.Random. Seeds random.Random does not take (like tuples) are reduced
+    with _seedInt first.
+    '''
+    if seed is None:
+        return random
+    if not isinstance(seed,(int,float,str,bytes,bytearray)):
+        seed=_seedInt(seed)
+    return random.Random(seed)
+_LOW_NIBBLE=bytes(i&15 for i in range(256))
+_HIGH_NIBBLE=bytes(i>>4 for i in range(256))
+_SHIFT_NIBBLE=bytes((i<<4)&255 for i in range(256))
+
+def _packNibbles(cells):
+    '''
+    Pack a bytes-like object of wall bitmasks (one cell per byte) into nibbles.
+    The bytewise OR is done on two big integers to stay out of Python loops.
+    '''
+    if len(cells)%2:
+        cells=bytes(cells)+b'\0'
+    lo=cells[0::2]
+    hi=bytes(cells[1::2]).translate(_SHIFT_NIBBLE)
+    n=len(lo)
+    return (int.from_bytes(lo,'little')|int.from_bytes(hi,'little')).to_bytes(n,'little')
+
+def _unpackNibbles(data,n):
+    '''
+    Inverse of _packNibbles, gives a bytearray of n wall bitmasks.
+    '''
+    cells=bytearray(2*len(data))
+    cells[0::2]=bytes(data).translate(_LOW_NIBBLE)
+    cells[1::2]=bytes(data).translate(_HIGH_NIBBLE)
+    del cells[n:]
+    return cells
+
+class _packedWalls:
+    '''
+    Wall store over packed wall nibbles inside a buffer, for example a
+    memory-mapped binary maze file. It is indexed like the bytearray store
+    (one wall bitmask per flat cell index) without unpacking anything.
+    '''
+    __slots__=('_buf','_off','_n')
+    def __init__(self,buf,n,offset=0):
+        self._buf=buf
+        self._n=n
+        self._off=offset
+    def __len__(self):
+        return self._n
+    def __getitem__(self,i):
+        if i<0:i+=self._n
+        if not 0<=i<self._n:
+            raise IndexError('cell index out of range')
+        b=self._buf[self._off+(i>>1)]
+        return b>>4 if i&1 else b&15
+    def __setitem__(self,i,v):
+        if i<0:i+=self._n
+        if not 0<=i<self._n:
+            raise IndexError('cell index out of range')
+        j=self._off+(i>>1)
+        b=self._buf[j]
+        self._buf[j]=(b&15)|(v<<4) if i&1 else (b&0xF0)|v
+    def packed(self):
+        '''
+        The packed nibbles, as stored in the binary file
+        '''
+        return self._buf[self._off:self._off+(self._n+1)//2]
+
+# Wall bitmasks of the 'E,W,N,S' part of the CSV maze lines
+_CSV_WALLS={f'{e},{w},{n},{s}':e*_E|w*_W|n*_N|s*_S for e in (0,1) for w in (0,1) for n in (0,1) for s in (0,1)}
+_CSV_BUFFER=1<<20
+
+def _csvMazeDims(filename):
+    '''
+    Rows and cols of a CSV maze file. The last line of the file is the last cell
+    (rows,cols), so it is read by seeking backwards from the end of the file.
+    '''
+    with open(filename,'rb') as f:
+        end=f.seek(0,os.SEEK_END)
+        pos=end
+        tail=b''
+        while pos>0:
+            step=min(pos,4096)
+            pos-=step
+            f.seek(pos)
+            tail=f.read(step)+tail
+            lines=tail.rstrip().splitlines()
+            if len(lines)>1 or (pos==0 and lines):
+                last=lines[-1].decode()
+                break
+        else:
+            raise ValueError(f'{filename} is not a maze CSV file!')
+    c=last.split(',')
+    return int(c[0].lstrip('"(')),int(c[1].rstrip(')"'))
+
+def isBinaryMaze(filename):
+    '''
+    True if the file is a binary maze file (and not a CSV maze file)
+    '''
+    with open(filename,'rb') as f:
+        return f.read(len(_BIN_MAGIC))==_BIN_MAGIC
+
+def csvToBinary(csvFile,binFile,goal=(1,1)):
+    '''
+    Convert a CSV maze file (as saved by CreateMaze) to the binary format.
+    The CSV file does not store the goal, so it is given here.
+    '''
+    m=maze(render=False)
+    m._loadCsv(csvFile)
+    m._goal=goal
+    m.saveBinary(binFile)
+
+def binaryToCsv(binFile,csvFile):
+    '''
+    Convert a binary maze file to the CSV format used by CreateMaze.
+    '''
+    m=maze(render=False)
+    m.loadBinary(binFile)
+    m._saveCsv(csvFile)
+
+def ellerRows(rows,cols,seed=None):
+    '''
+    Eller's algorithm. Generates a perfect maze one row at a time and yields
+    each row as a bytearray of cols wall bitmasks (same bits as the wall store).
+    Only the current row and its set labels are kept, so the memory is
+    proportional to cols and rows can be as large as needed.
+    seed--> Seed for a reproducible maze (None uses the module random)
+    '''
+    rng=_seedRng(seed)
+    rand=rng.random
+    sets=list(range(cols))
+    nextSet=cols
+    north=bytearray(cols)
+    for r in range(rows):
+        last=r==rows-1
+        row=bytearray(north)
+        # Join neighbours of different sets (all of them on the last row).
+        # The sets are joined with a small union-find that lives for this row only.
+        uf={}
+        def find(a):
+            while a in uf:
+                a=uf[a]
+            return a
+        for c in range(cols-1):
+            a,b=find(sets[c]),find(sets[c+1])
+            if a!=b and (last or rand()<0.5):
+                uf[b]=a
+                row[c]|=_E
+                row[c+1]|=_W
+        sets=[find(a) for a in sets]
+        if last:
+            yield row
+            return
+        # Every set goes down at least once
+        members={}
+        for c in range(cols):
+            members.setdefault(sets[c],[]).append(c)
+        north=bytearray(cols)
+        for group in members.values():
+            down=[c for c in group if rand()<0.5]
+            if not down:
+                down=[rng.choice(group)]
+            for c in down:
+                row[c]|=_S
+                north[c]=_N
+        for c in range(cols):
+            if not north[c]:
+                sets[c]=nextSet
+                nextSet+=1
+        yield row
+
+def saveEllerMaze(filename,rows,cols,goal=(1,1),seed=None):
+    '''
+    Generate a maze with ellerRows and write it straight into a binary maze
+    file, row by row, without ever holding the whole maze in memory.
+    '''
+    flags=0
+    if seed is not None:
+        flags|=_BIN_HAS_SEED
+    with open(filename,'wb') as f:
+        f.write(_BIN_HEADER.pack(_BIN_MAGIC,_BIN_VERSION,flags,rows,cols,goal[0],goal[1],_seedInt(seed) if flags else 0))
+        pending=b''
+        for row in ellerRows(rows,cols,seed):
+            if pending:
+                row=pending+row
+            # an odd cell at the end of the row shares its byte with the next row
+            pending=row[-1:] if len(row)%2 else b''
+            f.write(_packNibbles(row[:len(row)-len(pending)]))
+        if pending:
+            f.write(_packNibbles(pending))
+
+def _readBinaryHeader(f,filename):
+    '''
+    Read and check the header of a binary maze file open in f, and that the
+    file is long enough for the walls of rows*cols cells.
+    Returns (flags,rows,cols,goal x,goal y,seed).
+    '''
+    header=f.read(_BIN_HEADER.size)
+    if len(header)<_BIN_HEADER.size:
+        raise ValueError(f'{filename} is not a binary maze file!')
+    magic,version,flags,rows,cols,gx,gy,seed=_BIN_HEADER.unpack(header)
+    if magic!=_BIN_MAGIC:
+        raise ValueError(f'{filename} is not a binary maze file!')
+    if version!=_BIN_VERSION:
+        raise ValueError(f'Unsupported binary maze version {version}!')
+    if os.fstat(f.fileno()).st_size<_BIN_HEADER.size+(rows*cols+1)//2:
+        raise ValueError(f'{filename} is truncated, it is not a valid maze file!')
+    return flags,rows,cols,gx,gy,seed
+
+def _mappedMaze(filename):
+    '''
+    Map a binary maze file read only. Returns (mmap,walls,rows,cols,goal) with
+    walls a _packedWalls store reading the cells straight from the file.
+    '''
+    with open(filename,'rb') as f:
+        flags,rows,cols,gx,gy,seed=_readBinaryHeader(f,filename)
+        buf=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+    return buf,_packedWalls(buf,rows*cols,_BIN_HEADER.size),rows,cols,(gx,gy)
+
+# Headings of the file solvers in clockwise order N,E,S,W: wall bit and move name
+_HEADING_BIT=(_N,_E,_S,_W)
+_HEADING_NAME='NESW'
+
+def wallFollower(filename,start=None,goal=None,hand='right'):
+    '''
+    Solve a binary maze file by following the walls on one hand, reading the
+    walls through a memory map. Only the position and heading are kept, so any
+    maze that fits on disk can be solved.
+    Yields the moves ('E','W','N','S') as they are made, so ''.join() of them
+    is a path string for tracePath. The walk goes in and out of the dead ends
+    on the way (at most two moves per open wall). In a perfect maze it always
+    reaches the goal, in a maze with loops it can circle around forever, so it
+    stops when it is back on start with the same heading (no path).
+    start-->    Default is (rows,cols)
+    goal-->     Default is the goal saved in the file
+    hand-->     'right' or 'left'
+    '''
+    if hand not in ('right','left'):
+        raise ValueError(f'{hand} is not a valid hand!')
+    buf,walls,rows,cols,fileGoal=_mappedMaze(filename)
+    try:
+        x,y=start if start is not None else (rows,cols)
+        gx,gy=goal if goal is not None else fileGoal
+        i,g=(x-1)*cols+y-1,(gx-1)*cols+gy-1
+        step=(-cols,1,cols,-1)
+        turns=(1,0,3,2) if hand=='right' else (3,0,1,2)
+        heading=0
+        first=None
+        while i!=g:
+            w=walls[i]
+            c=i%cols
+            for t in turns:
+                h=(heading+t)%4
+                if w&_HEADING_BIT[h] and not (h==1 and c==cols-1 or h==3 and c==0 or h==0 and i<cols or h==2 and i+cols>=rows*cols):
+                    break
+            else:
+                return # a closed cell
+            if (i,h)==first:
+                return
+            if first is None:
+                first=(i,h)
+            heading=h
+            i+=step[h]
+            yield _HEADING_NAME[h]
+    finally:
+        buf.close()
+
+def tremaux(filename,start=None,goal=None,solution=True):
+    '''
+    Solve a binary maze file (with or without loops) with Tremaux's algorithm,
+    reading the walls through a memory map. Every passage between two cells is
+    marked when it is walked (0, 1 or 2 times) and the marks are the only thing
+    kept, two bits per passage in an anonymous memory map (n/2 bytes).
+    Once the goal is found, the passages marked once are the path from start
+    to goal.
+    Yields moves ('E','W','N','S'): the path from start to goal if solution
+    is True (streamed from the marks once the search is over), otherwise the
+    walk of the search as it is made. Nothing is yielded if there is no path.
+    start-->    Default is (rows,cols)
+    goal-->     Default is the goal saved in the file
+    '''
+    buf,walls,rows,cols,fileGoal=_mappedMaze(filename)
+    n=rows*cols
+    marks=mmap.mmap(-1,max(1,(2*n+3)//4))
+    try:
+        x,y=start if start is not None else (rows,cols)
+        gx,gy=goal if goal is not None else fileGoal
+        s,g=(x-1)*cols+y-1,(gx-1)*cols+gy-1
+        step=(-cols,1,cols,-1)
+        def passages(i):
+            # (heading,passage) of the open sides of the cell i. The passages are
+            # numbered 2*cell for the East wall and 2*cell+1 for the South wall.
+            w=walls[i]
+            c=i%cols
+            p=[]
+            if w&_N and i>=cols:p.append((0,2*(i-cols)+1))
+            if w&_E and c!=cols-1:p.append((1,2*i))
+            if w&_S and i+cols<n:p.append((2,2*i+1))
+            if w&_W and c!=0:p.append((3,2*i-2))
+            return p
+        i=s
+        back=-1 # heading back to the previous cell
+        while i!=g:
+            exits=passages(i)
+            counts=[(marks[e>>2]>>((e&3)<<1))&3 for h,e in exits]
+            came=-1
+            for k,(h,e) in enumerate(exits):
+                if h==back:
+                    came=k
+            if came>=0 and len(exits)>2 and counts[came]==1 and sum(1 for m in counts if m)>1:
+                # An old junction reached by a new passage: go back
+                k=came
+            else:
+                k=-1
+                for least in (0,1):
+                    for j,m in enumerate(counts):
+                        if m==least and j!=came:
+                            k=j
+                            break
+                    if k>=0:
+                        break
+                if k<0:
+                    if came<0 or counts[came]>=2:
+                        return # every passage walked twice, no path
+                    k=came
+            h,e=exits[k]
+            marks[e>>2]+=1<<((e&3)<<1)
+            i+=step[h]
+            back=(h+2)%4
+            if not solution:
+                yield _HEADING_NAME[h]
+        if not solution:
+            return
+        # The passages marked once lead from start to goal
+        i=s
+        back=-1
+        while i!=g:
+            for h,e in passages(i):
+                if h!=back and (marks[e>>2]>>((e&3)<<1))&3==1:
+                    break
+            else:
+                return
+            i+=step[h]
+            back=(h+2)%4
+            yield _HEADING_NAME[h]
+    finally:
+        marks.close()
+        buf.close()
+
+def _carveTile(task):
+    '''
+    Worker of CreateTiledMaze: carve a perfect maze in one tile and write its
+    walls into the wall store of the whole maze, a shared memory block.
+    The tiles do not overlap, so the workers never write the same bytes.
+    '''
+    name,cols,r0,r1,c0,c1,generator,seed=task
+    tile=maze(r1-r0,c1-c0,render=False)
+    tile._rng=random.Random(seed)
+    if generator=='kruskal':
+        deque(tile._carveKruskal(),maxlen=0)
+    elif generator=='wilson':
+        deque(tile._carveWilson(1,1),maxlen=0)
+    else:
+        deque(tile._carveBacktracker(1,1),maxlen=0)
+    shm=shared_memory.SharedMemory(name=name)
+    try:
+        w=c1-c0
+        for r in range(r1-r0):
+            shm.buf[(r0+r)*cols+c0:(r0+r)*cols+c1]=tile._walls[r*w:(r+1)*w]
+    finally:
+        shm.close()
+
+# RGB values of the Tkinter color names used by COLOR, for drawing without Tk
+_TK_RGB={
+    'white':(255,255,255),'black':(0,0,0),'red':(255,0,0),'gray11':(28,28,28),
+    'dim gray':(105,105,105),'red3':(205,0,0),'tomato':(255,99,71),
+    'cyan4':(0,139,139),'green4':(0,139,0),'pale green':(152,251,152),
+    'DeepSkyBlue4':(0,104,139),'DeepSkyBlue2':(0,178,238),'yellow2':(238,238,0),
+    'slategray2':(185,211,238),'violetred1':(255,62,150),
+}
+
+def _rgb(color):
+    '''
+    3 bytes RGB of a color given as a Tkinter name, '#rrggbb' or (r,g,b)
+    '''
+    if isinstance(color,str):
+        if color.startswith('#') and len(color)==7:
+            return bytes.fromhex(color[1:])
+        if color not in _TK_RGB:
+            raise ValueError(f'{color} is not a known color!')
+        color=_TK_RGB[color]
+    return bytes(color)
+
+def _encodePng(width,height,pixels):
+    '''
+    PNG file data of an RGB pixel buffer (no filtering, zlib compressed)
+    '''
+    def chunk(tag,data):
+        return struct.pack('>I',len(data))+tag+data+struct.pack('>I',zlib.crc32(tag+data)&0xffffffff)
+    stride=width*3
+    view=memoryview(pixels)
+    raw=b''.join(b'\0'+view[r*stride:(r+1)*stride] for r in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            +chunk(b'IHDR',struct.pack('>IIBBBBB',width,height,8,2,0,0,0))
+            +chunk(b'IDAT',zlib.compress(raw,6))
+            +chunk(b'IEND',b''))
+
+# Viewport mode: walls are drawn as lines from this cell width (pixels) on,
+# below it the visible part of the maze is shown as an image (level of detail)
+_VIEWPORT_DETAIL=6
+_VIEWPORT_MAX_PIXELS=16*2**20
+_VIEWPORT_ZOOMS=(3,4,5,6,8,10,12,16,20,24,32,40,48,64,80)
+
+def _encodePpm(width,height,pixels):
+    '''
+    Binary PPM (P6) file data of an RGB pixel buffer
+    '''
+    return b'P6\n%d %d\n255\n'%(width,height)+bytes(pixels)
+
+class mazeCache:
+    '''
+    On-disk cache of generated mazes, used by CreateMaze(seed=...,cache=...).
+    The entries are named by a hash of the generation arguments (content
+    addressed). Each entry is a binary maze file with the path appended as
+    one nibble per cell (the direction to the next cell of the path) and one
+    byte for the kind of path: 0 for a dictionary, 1 for a movePath.
+    The seed can be any hashable value: it is part of the key as it is, and
+    m.seed is the seed given to CreateMaze after a cache hit too.
+    path is the same type after a hit as after a generation: the dictionary
+    of every cell for a perfect maze, the movePath from (rows,cols) otherwise.
+    When the cache gets bigger than maxBytes, the least recently used
+    entries are removed.
+    '''
+    def __init__(self,directory,maxBytes=256*2**20):
+        '''
+        directory-->    Folder for the cache files, created if needed
+        maxBytes-->     Size limit of the cache
+        '''
+        self.directory=directory
+        self.maxBytes=maxBytes
+        os.makedirs(directory,exist_ok=True)
+    def key(self,rows,cols,x,y,pattern,loopPercent,generator,seed):
+        '''
+        Cache key of a generation
+        '''
+        args=(rows,cols,x,y,pattern,loopPercent,generator,seed)
+        return hashlib.sha1(repr(args).encode()).hexdigest()
+    def _file(self,key):
+        return os.path.join(self.directory,f'{key}.pmz')
+    def load(self,m,key):
+        '''
+        Load the cached maze into m. False if it is not in the cache.
+        '''
+        filename=self._file(key)
+        try:
+            m.loadBinary(filename,useMmap=False)
+            n=m.rows*m.cols
+            with open(filename,'rb') as f:
+                f.seek(_BIN_HEADER.size+(n+1)//2)
+                data=f.read((n+1)//2+1)
+            if len(data)!=(n+1)//2+1:
+                raise ValueError(f'{filename} is not a valid cache entry!')
+            moves=_unpackNibbles(data[:-1],n)
+            os.utime(filename)
+        except (OSError,ValueError):
+            return False
+        cols=m.cols
+        step={_E:1,_W:-1,_S:cols,_N:-cols}
+        if not data[-1]:
+            # The path of every cell towards the goal (a perfect maze)
+            m.path={(i//cols+1,i%cols+1):((i+step[d])//cols+1,(i+step[d])%cols+1) for i,d in enumerate(moves) if d}
+        else:
+            # Only the path from (rows,cols) to the goal (a maze with loops)
+            path=[]
+            i=n-1
+            while moves[i] and len(path)<n:
+                path.append(_DIR_NAME[moves[i]])
+                i+=step[moves[i]]
+            m.path=movePath((m.rows,cols),''.join(path))
+        return True
+    def store(self,m,key):
+        '''
+        Add the maze m to the cache and drop old entries if the cache is too big
+        '''
+        filename=self._file(key)
+        cols=m.cols
+        moves=bytearray(m.rows*cols)
+        for (x,y),(nx,ny) in (m.path or {}).items():
+            if nx==x:
+                d=_E if ny>y else _W
+            else:
+                d=_S if nx>x else _N
+            moves[(x-1)*cols+y-1]=d
+        tmp=f'{filename}.{os.getpid()}.tmp'
+        m.saveBinary(tmp)
+        with open(tmp,'ab') as f:
+            f.write(_packNibbles(moves))
+            f.write(bytes([isinstance(m.path,movePath)]))
+        os.replace(tmp,filename)
+        self._evict()
+    def _evict(self):
+        entries=[]
+        total=0
+        for e in os.scandir(self.directory):
+            if e.name.endswith('.pmz'):
+                st=e.stat()
+                entries.append((st.st_mtime,st.st_size,e.path))
+                total+=st.st_size
+        entries.sort()
+        for _,size,path in entries:
+            if total<=self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total-=size
 
 class COLOR(Enum):
     '''
@@ -53,8 +628,16 @@ class agent:
                     It is actually the agent.
         _body-->    You don't need to pass this
                     Tracks the body of the agent (the previous positions of it)
+        _wallItems-->   You don't need to pass this
+                        The four lines reused to draw the walls over a filled agent
+        _layerPrints--> You don't need to pass this
+                        The (color,rectangle) of the footprints painted on the
+                        footprint layer, to clear them when the agent is killed
         '''
         self._parentMaze=parentMaze
+        self._visited=set()
+        self._wallItems=[]
+        self._layerPrints=[]
         self.color=color
         if(isinstance(color,str)):
             if(color in COLOR.__members__):
@@ -76,6 +659,8 @@ class agent:
             self.goal=goal
         self._body=[]
         self.position=(self.x,self.y)
+        if footprints:
+            self._visited.add(self.position)
         
     @property
     def x(self):
@@ -89,6 +674,11 @@ class agent:
     @y.setter
     def y(self,newY):
         self._y=newY
+        if getattr(self,'footprints',False):
+            self._visited.add((self.x,newY))
+        if self._parentMaze._canvas is None:
+            # Headless maze, the agent will be drawn when the window is attached
+            return
         w=self._parentMaze._cell_width
         x=self.x*w-w+self._parentMaze._LabWidth
         y=self.y*w-w+self._parentMaze._LabWidth
@@ -100,6 +690,9 @@ class agent:
         else:
             self._coord=(y + w/2, x + 3*w/9,y + w/2, x + 3*w/9+w/4)
 
+        if hasattr(self,'_head') and self._parentMaze._footprintImage is not None:
+            self._moveOnLayer()
+            return
         if(hasattr(self,'_head')):
             if self.footprints is False:
                 self._parentMaze._canvas.delete(self._head)
@@ -112,9 +705,13 @@ class agent:
                     except:
                         pass
                     if self.filled:
-                        lll=self._parentMaze._canvas.coords(self._head)
-                        oldcell=(round(((lll[1]-26)/self._parentMaze._cell_width)+1),round(((lll[0]-26)/self._parentMaze._cell_width)+1))
-                        self._parentMaze._redrawCell(*oldcell,self._parentMaze.theme)
+                        try:
+                            # Maze lines stay on top of the footprint, no need to draw them again
+                            self._parentMaze._canvas.tag_lower(self._head,'line')
+                        except:
+                            lll=self._parentMaze._canvas.coords(self._head)
+                            oldcell=(round(((lll[1]-26)/self._parentMaze._cell_width)+1),round(((lll[0]-26)/self._parentMaze._cell_width)+1))
+                            self._parentMaze._redrawCell(*oldcell,self._parentMaze.theme)
                 else:
                     self._parentMaze._canvas.itemconfig(self._head, fill=self.color.value[1])#,outline='gray70')
                     self._parentMaze._canvas.tag_raise(self._head)
@@ -153,14 +750,34 @@ class agent:
                     self._parentMaze._canvas.tag_lower(self._head,'ov')
                 except:
                         pass
-                self._parentMaze._redrawCell(self.x,self.y,theme=self._parentMaze.theme)
+                self._parentMaze._redrawCell(self.x,self.y,theme=self._parentMaze.theme,items=self._wallItems)
         else:
             self._head=self._parentMaze._canvas.create_rectangle(*self._coord,fill=self.color.value[0],outline='')#stipple='gray75'
             try:
                 self._parentMaze._canvas.tag_lower(self._head,'ov')
             except:
                 pass
-            self._parentMaze._redrawCell(self.x,self.y,theme=self._parentMaze.theme)
+            self._parentMaze._redrawCell(self.x,self.y,theme=self._parentMaze.theme,items=self._wallItems)
+        self._drawnAt=(self.x,self.y)
+    def _moveOnLayer(self):
+        '''
+        Move the agent when the maze has a footprint layer. The footprint is
+        painted on the layer image and the same head item is moved, so moving
+        never creates a new canvas item.
+        '''
+        m=self._parentMaze
+        c=m._canvas
+        w=m._cell_width
+        if self.footprints:
+            fp=m._paintFootprint(c.coords(self._head),self.color.value[1],self.shape=='arrow')
+            if fp:
+                self._layerPrints.append(fp)
+        px,py=self._drawnAt
+        c.move(self._head,(self.y-py)*w,(self.x-px)*w)
+        self._coord=tuple(c.coords(self._head))
+        self._drawnAt=(self.x,self.y)
+        if self.filled and self.shape=='square':
+            m._redrawCell(self.x,self.y,m.theme,items=self._wallItems)
     @property
     def position(self):
         return (self.x,self.y)
@@ -238,6 +855,7 @@ class textLabel:
         self.title=title
         self._value=value
         self._parentMaze=parentMaze
+        self._parentMaze._attachWindow()
         # self._parentMaze._labels.append(self)
         self._var=None
         self.drawLabel()
@@ -254,75 +872,970 @@ class textLabel:
         self._var.set(f'{self.title} : {self.value}')
         self.lab.pack(expand = True,side=LEFT,anchor=NW)
 
+class _cellWalls(Mapping):
+    '''
+    Read-only view of the walls of one cell, behaving like the old
+    {'E':0/1,'W':0/1,'N':0/1,'S':0/1} dictionary of maze_map.
+    '''
+    __slots__=('_walls','_i')
+    def __init__(self,walls,i):
+        self._walls=walls
+        self._i=i
+    def __getitem__(self,d):
+        return 1 if self._walls[self._i]&_DIR_BIT[d] else 0
+    def __iter__(self):
+        return iter('EWNS')
+    def __len__(self):
+        return 4
+    def __repr__(self):
+        return repr(dict(self))
+
+class _mazeMapView(Mapping):
+    '''
+    Read-only view of the wall store with the old maze_map interface.
+    Keys are the cells (x,y) and values are _cellWalls views.
+    '''
+    __slots__=('_maze',)
+    def __init__(self,parentMaze):
+        self._maze=parentMaze
+    def __getitem__(self,cell):
+        m=self._maze
+        try:
+            x,y=cell
+            if 1<=x<=m.rows and 1<=y<=m.cols:
+                return _cellWalls(m._walls,(x-1)*m.cols+y-1)
+        except (TypeError,ValueError):
+            pass
+        raise KeyError(cell)
+    def __contains__(self,cell):
+        return cell in self._maze.grid
+    def __iter__(self):
+        return iter(self._maze.grid)
+    def __len__(self):
+        return self._maze.rows*self._maze.cols
+    def __repr__(self):
+        return repr(dict(self))
+
+class _gridView(Sequence):
+    '''
+    Read-only list of all cells of the maze, in the same (column by column)
+    order as the old grid list. Membership test is O(1).
+    '''
+    __slots__=('_maze',)
+    def __init__(self,parentMaze):
+        self._maze=parentMaze
+    def __getitem__(self,i):
+        rows=self._maze.rows
+        n=rows*self._maze.cols
+        if isinstance(i,slice):
+            return [self[j] for j in range(*i.indices(n))]
+        if i<0:i+=n
+        if not 0<=i<n:
+            raise IndexError('grid index out of range')
+        return (i%rows+1,i//rows+1)
+    def __contains__(self,cell):
+        try:
+            x,y=cell
+            return 1<=x<=self._maze.rows and 1<=y<=self._maze.cols
+        except (TypeError,ValueError):
+            return False
+    def __iter__(self):
+        for y in range(1,self._maze.cols+1):
+            for x in range(1,self._maze.rows+1):
+                yield (x,y)
+    def __len__(self):
+        return self._maze.rows*self._maze.cols
+    def __repr__(self):
+        return repr(list(self))
+
+class movePath(Mapping):
+    '''
+    A path stored compactly as its first cell and a string of moves (E,W,N,S),
+    one byte per step instead of a dictionary entry with two tuples.
+    It is a read-only mapping {cell:next cell} like maze.path, so code written
+    for path dictionaries keeps working. Looking the cells up one after the
+    other (following the path) is O(1) per step thanks to a cursor, other
+    lookups walk the path from its start. A cell visited twice maps to the
+    cell after its first visit.
+    tracePath follows the moves string directly, without building anything.
+    '''
+    __slots__=('start','moves','_cursor')
+    def __init__(self,start,moves=''):
+        '''
+        start-->    The first cell of the path
+        moves-->    String of moves, each one of 'E','W','N','S'
+        _cursor-->  You don't need to pass this
+                    Position and cell of the last lookup, to continue from it
+        '''
+        if moves.translate(_NOT_MOVE):
+            raise ValueError(f'{moves} is not a valid string of moves!')
+        self.start=tuple(start)
+        self.moves=moves
+        self._cursor=(0,self.start)
+    @classmethod
+    def fromDict(cls,path,start=None):
+        '''
+        The movePath of a path dictionary {cell:next cell}, followed from start.
+        start defaults to the only cell of the path that no other cell leads to.
+        '''
+        if start is None:
+            starts=path.keys()-set(path.values())
+            if len(starts)!=1:
+                raise ValueError('The start of the path is not unique, give start!')
+            start,=starts
+        moves=[]
+        cell=start
+        while cell in path and len(moves)<len(path):
+            nxt=path[cell]
+            d=_STEP_DIR.get((nxt[0]-cell[0],nxt[1]-cell[1]))
+            if d is None:
+                raise ValueError(f'{cell} and {nxt} are not neighbouring cells!')
+            moves.append(d)
+            cell=nxt
+        return cls(start,''.join(moves))
+    @classmethod
+    def fromRle(cls,start,text):
+        '''
+        The movePath of run-length encoded moves (see rle), like '3E2NW'
+        '''
+        if not _RLE.fullmatch(text):
+            raise ValueError(f'{text} is not a valid run-length encoded path!')
+        return cls(start,''.join(d*int(k or 1) for k,d in _RLE_RUN.findall(text)))
+    def rle(self):
+        '''
+        The moves run-length encoded, each run as its length (left out when it
+        is 1) followed by its direction, like '3E2NW' for 'EEENNW'
+        '''
+        return ''.join(f'{len(run)}{run[0]}' if len(run)>1 else run for run in (m.group() for m in _RLE_MOVES.finditer(self.moves)))
+    def _find(self,cell):
+        '''
+        Position of cell in the path (-1 if it is not on it or it is the end)
+        '''
+        pos,c=self._cursor
+        if c==cell and pos<len(self.moves):
+            return pos
+        x,y=self.start
+        for k,d in enumerate(self.moves):
+            if (x,y)==cell:
+                return k
+            dx,dy=_DIR_STEP[d]
+            x+=dx
+            y+=dy
+        return -1
+    def __getitem__(self,cell):
+        k=self._find(cell)
+        if k<0:
+            raise KeyError(cell)
+        dx,dy=_DIR_STEP[self.moves[k]]
+        nxt=(cell[0]+dx,cell[1]+dy)
+        self._cursor=(k+1,nxt)
+        return nxt
+    def __contains__(self,cell):
+        return self._find(cell)>=0
+    def __iter__(self):
+        x,y=self.start
+        for d in self.moves:
+            yield (x,y)
+            dx,dy=_DIR_STEP[d]
+            x+=dx
+            y+=dy
+    def __len__(self):
+        return len(self.moves)
+    @property
+    def end(self):
+        '''
+        The last cell of the path
+        '''
+        x,y=self.start
+        for d in 'EWNS':
+            dx,dy=_DIR_STEP[d]
+            k=self.moves.count(d)
+            x+=dx*k
+            y+=dy*k
+        return (x,y)
+    @property
+    def cells(self):
+        '''
+        A list-like view of the cells of the path, from start to end
+        '''
+        return _pathCells(self)
+    def __str__(self):
+        return self.moves
+    def __repr__(self):
+        return f'movePath({self.start},{self.moves!r})'
+
+class _pathCells(Sequence):
+    '''
+    Read-only list of the cells of a movePath (len(moves)+1 cells). Reading
+    the cells in order is O(1) per cell, going back starts again from the start.
+    '''
+    __slots__=('_path','_pos','_cell')
+    def __init__(self,path):
+        self._path=path
+        self._pos=0
+        self._cell=path.start
+    def __getitem__(self,i):
+        n=len(self._path.moves)+1
+        if isinstance(i,slice):
+            return [self[j] for j in range(*i.indices(n))]
+        if i<0:i+=n
+        if not 0<=i<n:
+            raise IndexError('path index out of range')
+        if i<self._pos:
+            self._pos,self._cell=0,self._path.start
+        x,y=self._cell
+        for d in self._path.moves[self._pos:i]:
+            dx,dy=_DIR_STEP[d]
+            x+=dx
+            y+=dy
+        self._pos,self._cell=i,(x,y)
+        return self._cell
+    def __iter__(self):
+        yield from self._path
+        yield self._path.end
+    def __len__(self):
+        return len(self._path.moves)+1
+    def __repr__(self):
+        return repr(list(self))
+
+class _fieldPath(Mapping):
+    '''
+    Read-only path dictionary {cell:next cell towards the goal} of every cell
+    connected to the goal, read straight from the distance field of the maze.
+    It is the path of a maze in dynamic mode (see maze.enableDynamicPath), so
+    it is always up to date with the walls without being rebuilt.
+    '''
+    __slots__=('_maze',)
+    def __init__(self,parentMaze):
+        self._maze=parentMaze
+    def __getitem__(self,cell):
+        m=self._maze
+        if cell not in m.grid:
+            raise KeyError(cell)
+        d=m.distanceField()[1][m.toIndex(*cell)]
+        if not d:
+            raise KeyError(cell)
+        dx,dy=_DIR_STEP[_DIR_NAME[d]]
+        return (cell[0]+dx,cell[1]+dy)
+    def __contains__(self,cell):
+        m=self._maze
+        return cell in m.grid and m.distanceField()[1][m.toIndex(*cell)]!=0
+    def __iter__(self):
+        m=self._maze
+        toGoal=m.distanceField()[1]
+        for i in range(len(toGoal)):
+            if toGoal[i]:
+                yield m.toCell(i)
+    def __len__(self):
+        return len(self._maze.distanceField()[1])-self._maze.distanceField()[1].count(0)
+
 class maze:
     '''
     This is the main class to create maze.
     '''
-    def __init__(self,rows=10,cols=10):
+    def __init__(self,rows=10,cols=10,render=True,mergeWalls=False,viewport=False,footprintLayer=False):
         '''
         rows--> No. of rows of the maze
         cols--> No. of columns of the maze
+        render--> False for a headless maze. Generation, loading, saving and path
+                  computation will not touch tkinter. The window is created only
+                  when it is needed (run, tracePath, key bindings or textLabel).
+        mergeWalls--> True to draw each straight run of walls as one canvas line
+                      (and each wall once) instead of up to four lines per cell.
+                      Much faster to draw and lighter for big mazes.
+        viewport--> True for huge mazes. Only the visible part of the maze is
+                    drawn, drag with the mouse to pan and use the mouse wheel
+                    (or + and -) to zoom. When zoomed out the maze is shown
+                    as an image instead of lines.
+        footprintLayer--> True to paint the footprints of the agents on one image
+                          under the maze lines instead of leaving a canvas item
+                          per move. The number of canvas items then stays the
+                          same however long the agents move. Not used with viewport.
         Need to pass just the two arguments. The rest will be assigned automatically
-        maze_map--> Will be set to a Dicationary. Keys will be cells and
+        maze_map--> A read-only Dictionary-like view. Keys will be cells and
                     values will be another dictionary with keys=['E','W','N','S'] for
                     East West North South and values will be 0 or 1. 0 means that 
                     direction(EWNS) is blocked. 1 means that direction is open.
-        grid--> A list of all cells
+        _walls--> The actual wall store behind maze_map. One byte per cell in a
+                  bytearray, indexed by the flat cell index (x-1)*cols+(y-1).
+                  Bits E=1,W=2,N=4,S=8 are set for the open sides.
+        grid--> A list-like view of all cells
         path--> Shortest path from start(bottom right) to goal(by default top left)
-                It will be a dictionary
+                It will be a dictionary, or a movePath when the maze has loops
+                or is loaded from a file
+        _pathPending--> True when path is computed on first use (see CreateTiledMaze)
         _win,_cell_width,_canvas -->    _win and )canvas are for Tkinter window and canvas
                                         _cell_width is cell width calculated automatically
+        seed--> The seed the maze was generated with (saved in binary maze files)
+        _rng--> The random generator used for generation, the module random
+                or a random.Random(seed) when a seed is given
         _agents-->  A list of aganets on the maze
         markedCells-->  Will be used to mark some particular cell during
                         path trace by the agent.
+        _traceQueue,_traceAfter-->  The tracePath calls waiting to be traced and
+                                    the pending callback of the animation clock
+        _dynamic--> True when the distance field is updated on wall edits
+                    instead of being recomputed (see enableDynamicPath)
+        _wallVersion--> Counts the changes of the walls, so what is built from
+                        them (like a mazeSolver) knows when it is out of date
+        _solver-->  The mazeSolver kept for the lab solvers (see mazeSolver.solverOf)
         _
         '''
         self.rows=rows
         self.cols=cols
-        self.maze_map={}
+        self.render=render
+        self.mergeWalls=mergeWalls
+        self.viewport=viewport
+        self.footprintLayer=footprintLayer
+        self._renderPending=False
+        self._lodImage=None
+        self._footprintImage=None
+        self._mazeMap=_mazeMapView(self)
+        self._wallVersion=0
+        self._solver=None
         self.grid=[]
         self.path={} 
+        self.seed=None
+        self._rng=random
         self._cell_width=50  
         self._win=None 
         self._canvas=None
         self._agents=[]
         self.markCells=[]
+        self._traceQueue=deque()
+        self._traceAfter=None
+        self._dynamic=False
 
     @property
+    def maze_map(self):
+        return self._mazeMap
+    @property
+    def path(self):
+        if self._pathPending:
+            self._path=self.pathFrom((self.rows,self.cols))
+            self._pathPending=False
+        return self._path
+    @path.setter
+    def path(self,p):
+        self._path=p
+        self._pathPending=False
+    @property
     def grid(self):
         return self._grid
     @grid.setter        
     def grid(self,n):
-        self._grid=[]
-        y=0
-        for n in range(self.cols):
-            x = 1
-            y = 1+y
-            for m in range(self.rows):
-                self.grid.append((x,y))
-                self.maze_map[x,y]={'E':0,'W':0,'N':0,'S':0}
-                x = x + 1 
+        '''
+        Setting the grid (to anything) resets the maze to all walls closed
+        for the current rows and cols.
+        '''
+        self._grid=_gridView(self)
+        self._walls=bytearray(self.rows*self.cols)
+        self._wallsChanged()
+
+    def toIndex(self,x,y):
+        '''
+        Flat index of the cell (x,y) in the wall store
+        '''
+        return (x-1)*self.cols+y-1
+    def toCell(self,idx):
+        '''
+        Cell (x,y) of the flat index idx
+        '''
+        return (idx//self.cols+1,idx%self.cols+1)
+    def _wallsChanged(self):
+        '''
+        The walls were changed (or replaced) without going through openWall or
+        closeWall: drop the distance field and count a new wall version
+        '''
+        self._field=None
+        self._wallVersion+=1
+    def walls(self,idx):
+        '''
+        Wall bitmask of the cell with flat index idx.
+        Bits E=1,W=2,N=4,S=8 are set for the open sides.
+        '''
+        return self._walls[idx]
+    def neighbors(self,idx):
+        '''
+        Flat indices of the cells reachable in one step from the cell idx
+        (in E,W,N,S order).
+        '''
+        w=self._walls[idx]
+        c=self.cols
+        n=[]
+        if w&_E and idx%c!=c-1:n.append(idx+1)
+        if w&_W and idx%c!=0:n.append(idx-1)
+        if w&_N and idx>=c:n.append(idx-c)
+        if w&_S and idx+c<len(self._walls):n.append(idx+c)
+        return n
+
     def _Open_East(self,x, y):
         '''
         To remove the East Wall of the cell
         '''
-        self.maze_map[x,y]['E']=1
+        i=(x-1)*self.cols+y-1
+        self._walls[i]|=_E
         if y+1<=self.cols:
-            self.maze_map[x,y+1]['W']=1
+            self._walls[i+1]|=_W
+            self._wallOpened(i,i+1)
     def _Open_West(self,x, y):
-        self.maze_map[x,y]['W']=1
+        i=(x-1)*self.cols+y-1
+        self._walls[i]|=_W
         if y-1>0:
-            self.maze_map[x,y-1]['E']=1
+            self._walls[i-1]|=_E
+            self._wallOpened(i,i-1)
     def _Open_North(self,x, y):
-        self.maze_map[x,y]['N']=1
+        i=(x-1)*self.cols+y-1
+        self._walls[i]|=_N
         if x-1>0:
-            self.maze_map[x-1,y]['S']=1
+            self._walls[i-self.cols]|=_S
+            self._wallOpened(i,i-self.cols)
     def _Open_South(self,x, y):
-        self.maze_map[x,y]['S']=1
+        i=(x-1)*self.cols+y-1
+        self._walls[i]|=_S
         if x+1<=self.rows:
-            self.maze_map[x+1,y]['N']=1
+            self._walls[i+self.cols]|=_N
+            self._wallOpened(i,i+self.cols)
     
-    def CreateMaze(self,x=1,y=1,pattern=None,loopPercent=0,saveMaze=False,loadMaze=None,theme:COLOR=COLOR.dark):
+    def _carveBacktracker(self,x,y,pattern=None,path=None,everyStep=False):
+        '''
+        Recursive Backtracker (randomized DFS) starting from the cell (x,y).
+        Visited cells are tracked in a bytearray and the bounds are checked
+        directly, so each step is O(1) and the whole maze is O(rows*cols).
+        The random choices are the same as the original list based version,
+        so the same seed gives the same maze_map and path.
+        Like the other _carve methods, it is a generator: every wall removed
+        is yielded as (flat index,direction bit) once it is open in the wall
+        store. path is filled with the path towards (x,y) if it is given.
+        everyStep-->    True to also yield None for the steps removing no wall
+                        (here the backtracking), so every step is O(1)
+        '''
+        rows,cols=self.rows,self.cols
+        walls=self._walls
+        choice=self._rng.choice
+        _closed=bytearray(rows*cols)
+        i=(x-1)*cols+y-1
+        _closed[i]=1
+        # The start is on the stack twice, so it is looked at again once
+        # everything else is done (in a one cell wide maze started in the
+        # middle, the other side would be left closed off otherwise).
+        _stack=[i,i]
+        if pattern is not None:
+            pattern=pattern.lower()
+        biasLength=2 # if pattern is 'v' or 'h'
+        if pattern=='h':
+            biasLength=max(cols//10,2)
+        if pattern=='v':
+            biasLength=max(rows//10,2)
+        bias=0
+
+        while _stack:
+            bias+=1
+            m=0
+            if y<cols and not _closed[i+1]:m|=_E
+            if y>1 and not _closed[i-1]:m|=_W
+            if x<rows and not _closed[i+cols]:m|=_S
+            if x>1 and not _closed[i-cols]:m|=_N
+            if m:
+                if pattern=='h' and bias<=biasLength:
+                    cell=_CARVE_H[m]
+                elif pattern=='v' and bias<=biasLength:
+                    cell=_CARVE_V[m]
+                else:
+                    cell=_CARVE[m]
+                    bias=0
+                current_cell = choice(cell)
+                if current_cell == "E":
+                    walls[i]|=_E
+                    walls[i+1]|=_W
+                    yield i,_E
+                    if path is not None:path[x,y+1]=x,y
+                    y+=1
+                    i+=1
+                elif current_cell == "W":
+                    walls[i]|=_W
+                    walls[i-1]|=_E
+                    yield i,_W
+                    if path is not None:path[x,y-1]=x,y
+                    y-=1
+                    i-=1
+                elif current_cell == "N":
+                    walls[i]|=_N
+                    walls[i-cols]|=_S
+                    yield i,_N
+                    if path is not None:path[x-1,y]=x,y
+                    x-=1
+                    i-=cols
+                else:
+                    walls[i]|=_S
+                    walls[i+cols]|=_N
+                    yield i,_S
+                    if path is not None:path[x+1,y]=x,y
+                    x+=1
+                    i+=cols
+                _closed[i]=1
+                _stack.append(i)
+            else:
+                i=_stack.pop()
+                x,y=i//cols+1,i%cols+1
+                if everyStep:
+                    yield None
+
+    def _carveKruskal(self,everyStep=False):
+        '''
+        Randomized Kruskal's algorithm. All inner walls are shuffled and a wall
+        is removed if the cells on its two sides are not connected yet. The
+        connected sets are kept in a union-find (with path halving) over the
+        flat cell indices, stored in an array of ints.
+        everyStep-->    True to also yield None for the walls kept
+        '''
+        rows,cols=self.rows,self.cols
+        n=rows*cols
+        walls=self._walls
+        parent=array('i',range(n))
+        # Wall 2*i is the East wall of cell i, 2*i+1 is its South wall
+        edges=array('i',(2*i for i in range(n) if i%cols!=cols-1))
+        edges.extend(range(1,2*(n-cols),2))
+        self._rng.shuffle(edges)
+        joined=0
+        for e in edges:
+            i=e>>1
+            j=i+cols if e&1 else i+1
+            a=i
+            while parent[a]!=a:
+                parent[a]=parent[parent[a]]
+                a=parent[a]
+            b=j
+            while parent[b]!=b:
+                parent[b]=parent[parent[b]]
+                b=parent[b]
+            if a==b:
+                if everyStep:
+                    yield None
+                continue
+            parent[a]=b
+            if e&1:
+                walls[i]|=_S
+                walls[j]|=_N
+                yield i,_S
+            else:
+                walls[i]|=_E
+                walls[j]|=_W
+                yield i,_E
+            joined+=1
+            if joined==n-1:
+                break
+
+    def _carveWilson(self,x,y,path=None,everyStep=False):
+        '''
+        Wilson's algorithm (loop-erased random walks) with the maze tree grown
+        from the cell (x,y). A random walk starts from a cell not yet in the
+        tree, remembering only the last direction taken out of each cell (this
+        erases the loops), and when it hits the tree the walk is carved.
+        The walks also give the path from every cell towards (x,y), filled
+        in path if it is given.
+        everyStep-->    True to also yield None for every step of the random
+                        walks and every cell found already in the tree
+        '''
+        rows,cols=self.rows,self.cols
+        n=rows*cols
+        walls=self._walls
+        choice=self._rng.choice
+        step={_E:1,_W:-1,_S:cols,_N:-cols}
+        inTree=bytearray(n)
+        inTree[(x-1)*cols+y-1]=1
+        nxt=bytearray(n)
+        for s in range(n):
+            if inTree[s]:
+                if everyStep:
+                    yield None
+                continue
+            i=s
+            while not inTree[i]:
+                r,c=divmod(i,cols)
+                m=0
+                if c<cols-1:m|=_E
+                if c>0:m|=_W
+                if r<rows-1:m|=_S
+                if r>0:m|=_N
+                d=choice(_DIR_BITS[m])
+                nxt[i]=d
+                i+=step[d]
+                if everyStep:
+                    yield None
+            i=s
+            while not inTree[i]:
+                d=nxt[i]
+                j=i+step[d]
+                walls[i]|=d
+                walls[j]|=_OPPOSITE[d]
+                inTree[i]=1
+                yield i,d
+                if path is not None:path[i//cols+1,i%cols+1]=(j//cols+1,j%cols+1)
+                i=j
+
+    def _treePath(self,x,y):
+        '''
+        Breadth First Search over the whole maze from (x,y), to get the path
+        from every cell towards (x,y) in the same form as the generation of
+        the Recursive Backtracker gives it.
+        '''
+        cols=self.cols
+        path={}
+        root=(x-1)*cols+y-1
+        seen=bytearray(self.rows*cols)
+        seen[root]=1
+        frontier=deque([root])
+        while frontier:
+            i=frontier.popleft()
+            cell=(i//cols+1,i%cols+1)
+            for j in self.neighbors(i):
+                if not seen[j]:
+                    seen[j]=1
+                    path[j//cols+1,j%cols+1]=cell
+                    frontier.append(j)
+        return path
+
+    def distanceField(self):
+        '''
+        Distance to the goal and direction towards the goal of every cell, from
+        one Breadth First Search started at the goal.
+        dist--> array of ints, the number of steps to the goal (-1 if the cell
+                is not connected to the goal)
+        toGoal--> bytearray with the bit (E,W,N,S) of the direction to take
+                  (0 for the goal and the cells not connected to it)
+        Both are indexed by the flat cell index. The field is computed once and
+        kept until the walls or the goal change, so the path from any cell is
+        read off it without a new search (see pathFrom and goalDistance).
+        '''
+        if self._field is not None:
+            return self._field
+        cols=self.cols
+        n=self.rows*cols
+        walls=self._walls
+        dist=array('i',[-1])*n
+        toGoal=bytearray(n)
+        queue=array('i',[0])*n
+        g=(self._goal[0]-1)*cols+self._goal[1]-1
+        dist[g]=0
+        queue[0]=g
+        head,tail=0,1
+        while head<tail:
+            i=queue[head]
+            head+=1
+            d=dist[i]+1
+            w=walls[i]
+            c=i%cols
+            if w&_E and c!=cols-1 and dist[i+1]<0:
+                dist[i+1]=d
+                toGoal[i+1]=_W
+                queue[tail]=i+1
+                tail+=1
+            if w&_W and c!=0 and dist[i-1]<0:
+                dist[i-1]=d
+                toGoal[i-1]=_E
+                queue[tail]=i-1
+                tail+=1
+            if w&_N and i>=cols and dist[i-cols]<0:
+                dist[i-cols]=d
+                toGoal[i-cols]=_S
+                queue[tail]=i-cols
+                tail+=1
+            if w&_S and i+cols<n and dist[i+cols]<0:
+                dist[i+cols]=d
+                toGoal[i+cols]=_N
+                queue[tail]=i+cols
+                tail+=1
+        self._field=(dist,toGoal)
+        return self._field
+
+    def goalDistance(self,cell):
+        '''
+        Length of the shortest path from cell to the goal (None if there is no path)
+        '''
+        dist=self.distanceField()[0][self.toIndex(*cell)]
+        return dist if dist>=0 else None
+
+    def pathFrom(self,cell):
+        '''
+        Shortest path from cell to the goal, as a movePath (a mapping like path).
+        It is read off the distance field, so it takes time proportional to the
+        length of the path. None if the goal cannot be reached from cell.
+        '''
+        dist,toGoal=self.distanceField()
+        cols=self.cols
+        step={_E:1,_W:-1,_S:cols,_N:-cols}
+        i=self.toIndex(*cell)
+        if dist[i]<0:
+            return None
+        moves=[]
+        while toGoal[i]:
+            moves.append(_DIR_NAME[toGoal[i]])
+            i+=step[toGoal[i]]
+        return movePath(cell,''.join(moves))
+
+    def enableDynamicPath(self):
+        '''
+        Dynamic mode: the distance field (and so goalDistance and pathFrom) is
+        kept up to date as walls are opened or closed (openWall, closeWall and
+        the _Open_ methods), with work proportional to the cells whose distance
+        changes instead of a new search over the whole maze.
+        path becomes a view of the field {cell:next cell towards the goal} for
+        every cell connected to the goal, so it never needs to be rebuilt.
+        Call it after CreateMaze (CreateMaze sets path again).
+        '''
+        self._dynamic=True
+        self.distanceField()
+        self.path=_fieldPath(self)
+
+    def _wallSides(self,c,d):
+        '''
+        Flat indices of the cell c and of its neighbour on the side d (None at
+        the border of the maze)
+        '''
+        if d not in _DIR_BIT:
+            raise ValueError(f'{d} is not a valid direction!')
+        if c not in self.grid:
+            raise ValueError(f'{c} is not a cell of the maze!')
+        dx,dy=_DIR_STEP[d]
+        nb=(c[0]+dx,c[1]+dy)
+        return self.toIndex(*c),(self.toIndex(*nb) if nb in self.grid else None)
+
+    def openWall(self,cell,d):
+        '''
+        Remove the wall on the side d ('E','W','N' or 'S') of cell
+        '''
+        self._wallSides(cell,d)
+        getattr(self,'_Open_'+{'E':'East','W':'West','N':'North','S':'South'}[d])(*cell)
+
+    def closeWall(self,cell,d):
+        '''
+        Put back the wall on the side d ('E','W','N' or 'S') of cell
+        '''
+        i,j=self._wallSides(cell,d)
+        b=_DIR_BIT[d]
+        self._walls[i]&=~b
+        if j is not None:
+            self._walls[j]&=~_OPPOSITE[b]
+            self._wallClosed(i,j)
+
+    def _openSides(self,i):
+        '''
+        (neighbour,direction bit) of the open sides of the cell i
+        '''
+        w=self._walls[i]
+        c=self.cols
+        if w&_E and i%c!=c-1:yield i+1,_E
+        if w&_W and i%c!=0:yield i-1,_W
+        if w&_N and i>=c:yield i-c,_N
+        if w&_S and i+c<len(self._walls):yield i+c,_S
+
+    def _wallOpened(self,i,j):
+        '''
+        The wall between the cells i and j was opened. Without dynamic mode the
+        distance field is dropped. In dynamic mode, if one cell gets closer to
+        the goal through the other, the shorter distances are spread from it
+        (Breadth First) to the cells that get closer too.
+        '''
+        self._wallVersion+=1
+        if self._field is None:
+            return
+        if not self._dynamic:
+            self._field=None
+            return
+        dist,toGoal=self._field
+        if dist[j]>=0 and (dist[i]<0 or dist[j]+1<dist[i]):
+            i,j=j,i
+        elif not (dist[i]>=0 and (dist[j]<0 or dist[i]+1<dist[j])):
+            return
+        cols=self.cols
+        step={1:_W,-1:_E,cols:_N,-cols:_S}
+        dist[j]=dist[i]+1
+        toGoal[j]=step[j-i]
+        queue=deque([j])
+        while queue:
+            u=queue.popleft()
+            d=dist[u]+1
+            for v,b in self._openSides(u):
+                if dist[v]<0 or d<dist[v]:
+                    dist[v]=d
+                    toGoal[v]=_OPPOSITE[b]
+                    queue.append(v)
+
+    def _wallClosed(self,i,j):
+        '''
+        The wall between the cells i and j was closed. Without dynamic mode the
+        distance field is dropped. In dynamic mode, if one cell was reaching the
+        goal through the other, the cells that were reaching the goal through
+        it (its subtree) lose their distance and get it again from the cells
+        around the subtree, in order of distance (Dijkstra with a heap).
+        '''
+        self._wallVersion+=1
+        if self._field is None:
+            return
+        if not self._dynamic:
+            self._field=None
+            return
+        dist,toGoal=self._field
+        cols=self.cols
+        step={_E:1,_W:-1,_S:cols,_N:-cols}
+        if toGoal[i] and i+step[toGoal[i]]==j:
+            root=i
+        elif toGoal[j] and j+step[toGoal[j]]==i:
+            root=j
+        else:
+            return
+        dist[root]=-1
+        toGoal[root]=0
+        subtree=[root]
+        for u in subtree:
+            for v,b in self._openSides(u):
+                if toGoal[v]==_OPPOSITE[b]:
+                    dist[v]=-1
+                    toGoal[v]=0
+                    subtree.append(v)
+        heap=[]
+        for u in subtree:
+            for v,b in self._openSides(u):
+                if dist[v]>=0:
+                    heappush(heap,(dist[v]+1,u,b))
+        while heap:
+            d,u,b=heappop(heap)
+            if dist[u]>=0:
+                continue
+            dist[u]=d
+            toGoal[u]=b
+            for v,b in self._openSides(u):
+                if dist[v]<0:
+                    heappush(heap,(d+1,v,_OPPOSITE[b]))
+
+    def _isCyclic(self,i,d):
+        '''
+        To avoid too much blank(clear) path.
+        True if removing the wall d of the cell i would open a complete 2x2 block.
+        '''
+        walls=self._walls
+        cols=self.cols
+        n=len(walls)
+        if d&(_E|_W):
+            left=i if d==_E else i-1
+            right=left+1
+            if walls[left]&_S and walls[right]&_S and left+cols<n and walls[left+cols]&_E:
+                return True
+            if walls[left]&_N and walls[right]&_N and left>=cols and walls[left-cols]&_E:
+                return True
+        else:
+            top=i if d==_S else i-cols
+            bottom=top+cols
+            if walls[top]&_E and walls[bottom]&_E and top%cols!=cols-1 and walls[top+1]&_S:
+                return True
+            if walls[top]&_W and walls[bottom]&_W and top%cols!=0 and walls[top-1]&_S:
+                return True
+        return False
+
+    def _addLoops(self,loopPercent):
+        '''
+        Multiple Path Loops
+        Removes loopPercent/3 percent of the cells' walls, separately for the cells
+        on the path from (rows,cols) to the goal and for the rest of the cells.
+        Each cell gets one try with one of its closed walls picked at random, and
+        the wall is not removed if that would open a 2x2 block (_isCyclic).
+        Everything works on flat indices with O(1) checks, so it is linear time.
+        '''
+        rows,cols=self.rows,self.cols
+        n=rows*cols
+        walls=self._walls
+        step={_E:1,_W:-1,_S:cols,_N:-cols}
+        offPath=bytearray(b'\x01')*n
+        cell=(rows,cols)
+        pathCells=[]
+        path=self.path
+        while True:
+            i=(cell[0]-1)*cols+cell[1]-1
+            if not offPath[i]:
+                break
+            offPath[i]=0
+            pathCells.append(i)
+            if cell==self._goal or cell not in path:
+                break
+            cell=path[cell]
+        # An array of 4 bytes per cell (not a list) so huge mazes fit in memory,
+        # shuffled the same as a list would be
+        notPathCells=array('i',itertools.compress(range(n),offPath))
+        del offPath
+        self._rng.shuffle(pathCells)
+        self._rng.shuffle(notPathCells)
+        for cells in (pathCells,notPathCells):
+            target=len(cells)/3*loopPercent/100 #these many blocks to remove
+            count=0
+            for i in cells:
+                if count>=target:
+                    break
+                r,c=divmod(i,cols)
+                m=0
+                if c<cols-1:m|=_E
+                if c>0:m|=_W
+                if r<rows-1:m|=_S
+                if r>0:m|=_N
+                m&=~walls[i]
+                if m:
+                    d=self._rng.choice(_DIR_BITS[m])
+                    if not self._isCyclic(i,d):
+                        walls[i]|=d
+                        walls[i+step[d]]|=_OPPOSITE[d]
+                        count+=1
+
+    def carveSteps(self,x=1,y=1,pattern=None,generator='backtracker',seed=None):
+        '''
+        Generate a perfect maze step by step instead of all at once like CreateMaze.
+        Returns an iterator giving ((x,y),d) for every wall removed, d being
+        'E','W','N' or 'S' of the cell (x,y), and None for the steps of the
+        algorithm removing no wall (backtracking, walls kept by 'kruskal', the
+        random walks of 'wilson'). The wall is already open in the wall store
+        when it is given, so maze_map is always up to date with the steps taken
+        so far, and pathFrom and goalDistance can be called between two steps
+        (for the maze carved so far). The iteration can be stopped at any point
+        (leaving a partly carved maze), run a few steps at a time from a Tk
+        after callback, or the steps written to disk as they come.
+        The maze is reset to all walls closed first. Nothing is kept besides the
+        state of the algorithm itself (a few bytes per cell), no path dictionary
+        is built. Once done, pathFrom and goalDistance give the path to the goal.
+        Every step is O(1), after the setup of the first one ('kruskal' makes
+        and shuffles the list of all the walls then).
+        x,y,pattern,generator,seed--> Same as CreateMaze. The same seed gives the
+                                      same maze as CreateMaze (without loops).
+        '''
+        if generator not in ('backtracker','kruskal','wilson'):
+            raise ValueError(f'{generator} is not a valid maze generator!')
+        self.grid=[]
+        self.path={}
+        self._goal=(x,y)
+        self.seed=seed
+        self._rng=_seedRng(seed)
+        if generator=='kruskal':
+            steps=self._carveKruskal(everyStep=True)
+        elif generator=='wilson':
+            steps=self._carveWilson(x,y,everyStep=True)
+        else:
+            steps=self._carveBacktracker(x,y,pattern,everyStep=True)
+        return self._cellSteps(steps)
+
+    def _cellSteps(self,steps):
+        '''
+        The steps of a _carve method as carveSteps gives them. The distance
+        field is dropped at every wall removed, as the walls are written
+        straight into the wall store.
+        '''
+        cols=self.cols
+        for step in steps:
+            if step is None:
+                yield None
+                continue
+            i,d=step
+            self._wallsChanged()
+            yield (i//cols+1,i%cols+1),_DIR_NAME[d]
+
+    def CreateMaze(self,x=1,y=1,pattern=None,loopPercent=0,saveMaze=False,loadMaze=None,theme:COLOR=COLOR.dark,generator='backtracker',seed=None,cache=None):
         '''
         One very important function to create a Random Maze
         pattern-->  It can be 'v' for vertical or 'h' for horizontal
@@ -333,70 +1846,30 @@ class maze:
                         Higher the value (max 100) more will be the loops
         saveMaze--> To save the generated Maze as CSV file for future reference.
         loadMaze--> Provide the CSV file to generate a desried maze
+                    A binary maze file (see saveBinary) can also be given, then
+                    the goal is taken from the file instead of x,y.
         theme--> Dark or Light
+        generator-->    The algorithm used to generate the maze
+                        'backtracker' (default) Recursive Backtracker, long corridors
+                        'kruskal'   Randomized Kruskal with union-find, many short dead ends
+                        'wilson'    Wilson's loop-erased random walks, uniform spanning tree
+                        pattern is only used with the 'backtracker' generator.
+        seed--> Any hashable value (an int, a str, a tuple...). The same seed (and other arguments) always
+                generate the same maze. None uses the module random as before.
+        cache-->    A mazeCache (or a directory for one). With a seed given, the
+                    maze is loaded from the cache if it was generated before,
+                    otherwise it is generated and stored in the cache.
         '''
-        _stack=[]
-        _closed=[]
         self.theme=theme
         self._goal=(x,y)
+        self._wallsChanged()
         if(isinstance(theme,str)):
             if(theme in COLOR.__members__):
                 self.theme=COLOR[theme]
             else:
                 raise ValueError(f'{theme} is not a valid theme COLOR!')
-        def blockedNeighbours(cell):
-            n=[]
-            for d in self.maze_map[cell].keys():
-                if self.maze_map[cell][d]==0:
-                    if d=='E' and (cell[0],cell[1]+1) in self.grid:
-                        n.append((cell[0],cell[1]+1))
-                    elif d=='W' and (cell[0],cell[1]-1) in self.grid:
-                        n.append((cell[0],cell[1]-1))
-                    elif d=='N' and (cell[0]-1,cell[1]) in self.grid:
-                        n.append((cell[0]-1,cell[1]))
-                    elif d=='S' and (cell[0]+1,cell[1]) in self.grid:
-                        n.append((cell[0]+1,cell[1]))
-            return n
-        def removeWallinBetween(cell1,cell2):
-            '''
-            To remove wall in between two cells
-            '''
-            if cell1[0]==cell2[0]:
-                if cell1[1]==cell2[1]+1:
-                    self.maze_map[cell1]['W']=1
-                    self.maze_map[cell2]['E']=1
-                else:
-                    self.maze_map[cell1]['E']=1
-                    self.maze_map[cell2]['W']=1
-            else:
-                if cell1[0]==cell2[0]+1:
-                    self.maze_map[cell1]['N']=1
-                    self.maze_map[cell2]['S']=1
-                else:
-                    self.maze_map[cell1]['S']=1
-                    self.maze_map[cell2]['N']=1
-        def isCyclic(cell1,cell2):
-            '''
-            To avoid too much blank(clear) path.
-            '''
-            ans=False
-            if cell1[0]==cell2[0]:
-                if cell1[1]>cell2[1]: cell1,cell2=cell2,cell1
-                if self.maze_map[cell1]['S']==1 and self.maze_map[cell2]['S']==1:
-                    if (cell1[0]+1,cell1[1]) in self.grid and self.maze_map[(cell1[0]+1,cell1[1])]['E']==1:
-                        ans= True
-                if self.maze_map[cell1]['N']==1 and self.maze_map[cell2]['N']==1:
-                    if (cell1[0]-1,cell1[1]) in self.grid and self.maze_map[(cell1[0]-1,cell1[1])]['E']==1:
-                        ans= True
-            else:
-                if cell1[0]>cell2[0]: cell1,cell2=cell2,cell1
-                if self.maze_map[cell1]['E']==1 and self.maze_map[cell2]['E']==1:
-                    if (cell1[0],cell1[1]+1) in self.grid and self.maze_map[(cell1[0],cell1[1]+1)]['S']==1:
-                        ans= True
-                if self.maze_map[cell1]['W']==1 and self.maze_map[cell2]['W']==1:
-                    if (cell1[0],cell1[1]-1) in self.grid and self.maze_map[(cell1[0],cell1[1]-1)]['S']==1:
-                        ans= True
-            return ans
+        if generator not in ('backtracker','kruskal','wilson'):
+            raise ValueError(f'{generator} is not a valid maze generator!')
         def BFS(cell):
             '''
             Breadth First Search
@@ -432,163 +1905,228 @@ class maze:
                     path[nextCell] = cell
                     frontier.append(nextCell)
                     visited.add(nextCell)
-            fwdPath={}
+            moves=[]
             cell=self._goal
             while cell!=(self.rows,self.cols):
                 try:
-                    fwdPath[path[cell]]=cell
-                    cell=path[cell]
+                    prev=path[cell]
                 except:
                     print('Path to goal not found!')
                     return
-            return fwdPath
+                moves.append(_STEP_DIR[cell[0]-prev[0],cell[1]-prev[1]])
+                cell=prev
+            return movePath(cell,''.join(reversed(moves)))
         # if maze is to be generated randomly
         if not loadMaze:
-            _stack.append((x,y))
-            _closed.append((x,y))
-            biasLength=2 # if pattern is 'v' or 'h'
-            if(pattern is not None and pattern.lower()=='h'):
-                biasLength=max(self.cols//10,2)
-            if(pattern is not None and pattern.lower()=='v'):
-                biasLength=max(self.rows//10,2)
-            bias=0
-
-            while len(_stack) > 0:
-                cell = []
-                bias+=1
-                if(x , y +1) not in _closed and (x , y+1) in self.grid:
-                    cell.append("E")
-                if (x , y-1) not in _closed and (x , y-1) in self.grid:
-                    cell.append("W")
-                if (x+1, y ) not in _closed and (x+1 , y ) in self.grid:
-                    cell.append("S")
-                if (x-1, y ) not in _closed and (x-1 , y) in self.grid:
-                    cell.append("N") 
-                if len(cell) > 0:    
-                    if pattern is not None and pattern.lower()=='h' and bias<=biasLength:
-                        if('E' in cell or 'W' in cell):
-                            if 'S' in cell:cell.remove('S')
-                            if 'N' in cell:cell.remove('N')
-                    elif pattern is not None and pattern.lower()=='v' and bias<=biasLength:
-                        if('N' in cell or 'S' in cell):
-                            if 'E' in cell:cell.remove('E')
-                            if 'W' in cell:cell.remove('W')
-                    else:
-                        bias=0
-                    current_cell = (random.choice(cell))
-                    if current_cell == "E":
-                        self._Open_East(x,y)
-                        self.path[x, y+1] = x, y
-                        y = y + 1
-                        _closed.append((x, y))
-                        _stack.append((x, y))
-
-                    elif current_cell == "W":
-                        self._Open_West(x, y)
-                        self.path[x , y-1] = x, y
-                        y = y - 1
-                        _closed.append((x, y))
-                        _stack.append((x, y))
-
-                    elif current_cell == "N":
-                        self._Open_North(x, y)
-                        self.path[(x-1 , y)] = x, y
-                        x = x - 1
-                        _closed.append((x, y))
-                        _stack.append((x, y))
-
-                    elif current_cell == "S":
-                        self._Open_South(x, y)
-                        self.path[(x+1 , y)] = x, y
-                        x = x + 1
-                        _closed.append((x, y))
-                        _stack.append((x, y))
-
+            self.seed=seed
+            self._rng=_seedRng(seed)
+            key=None
+            if cache is not None and seed is not None:
+                if isinstance(cache,str):
+                    cache=mazeCache(cache)
+                key=cache.key(self.rows,self.cols,x,y,pattern,loopPercent,generator,seed)
+            if key is not None and cache.load(self,key):
+                # The file only holds the seed reduced to an int64
+                self.seed=seed
+            else:
+                if generator=='kruskal':
+                    deque(self._carveKruskal(),maxlen=0)
+                    self.path=self._treePath(x,y)
+                elif generator=='wilson':
+                    deque(self._carveWilson(x,y,self.path),maxlen=0)
                 else:
-                    x, y = _stack.pop()
-
-            ## Multiple Path Loops
-            if loopPercent!=0:
-                
-                x,y=self.rows,self.cols
-                pathCells=[(x,y)]
-                while x!=self.rows or y!=self.cols:
-                    x,y=self.path[(x,y)]
-                    pathCells.append((x,y))
-                notPathCells=[i for i in self.grid if i not in pathCells]
-                random.shuffle(pathCells)
-                random.shuffle(notPathCells)
-                pathLength=len(pathCells)
-                notPathLength=len(notPathCells)
-                count1,count2=pathLength/3*loopPercent/100,notPathLength/3*loopPercent/100
-                
-                #remove blocks from shortest path cells
-                count=0
-                i=0
-                while count<count1: #these many blocks to remove
-                    if len(blockedNeighbours(pathCells[i]))>0:
-                        cell=random.choice(blockedNeighbours(pathCells[i]))
-                        if not isCyclic(cell,pathCells[i]):
-                            removeWallinBetween(cell,pathCells[i])
-                            count+=1
-                        i+=1
-                            
-                    else:
-                        i+=1
-                    if i==len(pathCells):
-                        break
-                #remove blocks from outside shortest path cells
-                if len(notPathCells)>0:
-                    count=0
-                    i=0
-                    while count<count2: #these many blocks to remove
-                        if len(blockedNeighbours(notPathCells[i]))>0:
-                            cell=random.choice(blockedNeighbours(notPathCells[i]))
-                            if not isCyclic(cell,notPathCells[i]):
-                                removeWallinBetween(cell,notPathCells[i])
-                                count+=1
-                            i+=1
-                                
-                        else:
-                            i+=1
-                        if i==len(notPathCells):
-                            break
-                self.path=BFS((self.rows,self.cols))
+                    deque(self._carveBacktracker(x,y,pattern,self.path),maxlen=0)
+
+                ## Multiple Path Loops
+                if loopPercent!=0:
+                    self._addLoops(loopPercent)
+                    self.path=BFS((self.rows,self.cols))
+                if key is not None:
+                    cache.store(self,key)
         else:
-            # Load maze from CSV file
-            with open(loadMaze,'r') as f:
-                last=list(f.readlines())[-1]
-                c=last.split(',')
-                c[0]=int(c[0].lstrip('"('))
-                c[1]=int(c[1].rstrip(')"'))
-                self.rows=c[0]
-                self.cols=c[1]
-                self.grid=[]
-
-            with open(loadMaze,'r') as f:
-                r=csv.reader(f)
-                next(r)
-                for i in r:
-                    c=i[0].split(',')
-                    c[0]=int(c[0].lstrip('('))
-                    c[1]=int(c[1].rstrip(')'))
-                    self.maze_map[tuple(c)]={'E':int(i[1]),'W':int(i[2]),'N':int(i[3]),'S':int(i[4])}
+            if isBinaryMaze(loadMaze):
+                self.loadBinary(loadMaze)
+            else:
+                self._loadCsv(loadMaze)
             self.path=BFS((self.rows,self.cols))
-        self._drawMaze(self.theme)
+        if self.render:
+            self._attachWindow()
         agent(self,*self._goal,shape='square',filled=True,color=COLOR.green)
         if saveMaze:
             dt_string = datetime.datetime.now().strftime("%Y-%m-%d--%H-%M-%S")
-            with open(f'maze--{dt_string}.csv','w',newline='') as f:
-                writer=csv.writer(f)
-                writer.writerow(['  cell  ','E','W','N','S'])
-                for k,v in self.maze_map.items():
-                    entry=[k]
-                    for i in v.values():
-                        entry.append(i)
-                    writer.writerow(entry)
-                f.seek(0, os.SEEK_END)
-                f.seek(f.tell()-2, os.SEEK_SET)
-                f.truncate()
+            self._saveCsv(f'maze--{dt_string}.csv')
+
+    def CreateTiledMaze(self,x=1,y=1,loopPercent=0,theme:COLOR=COLOR.dark,generator='backtracker',seed=None,tileSize=512,processes=None):
+        '''
+        Create a random maze too big for CreateMaze, using several processes.
+        The grid is split into tiles of tileSize x tileSize cells and a perfect
+        maze is carved in every tile by a pool of worker processes, straight into
+        a shared memory wall store. The tiles are then joined by opening one wall
+        between the tiles along a random spanning tree of the tiles, so the whole
+        maze is still a perfect maze. Loops are added afterwards like CreateMaze.
+        The same seed gives the same maze whatever the number of processes.
+        path is the shortest path from (rows,cols) to the goal as a movePath
+        (not the path from every cell, which would not fit in memory). It is
+        only computed the first time path is used, as that takes a search over
+        the whole maze (several bytes per cell) that is not needed otherwise.
+        With loopPercent the path before the loops is needed, so that search
+        is done once while creating the maze.
+        x,y,loopPercent,theme,generator,seed-->   Same as CreateMaze
+        tileSize--> Number of rows and columns of the tiles
+        processes-->    Number of worker processes (default is the number of CPUs)
+        '''
+        self.theme=theme
+        if(isinstance(theme,str)):
+            if(theme in COLOR.__members__):
+                self.theme=COLOR[theme]
+            else:
+                raise ValueError(f'{theme} is not a valid theme COLOR!')
+        if generator not in ('backtracker','kruskal','wilson'):
+            raise ValueError(f'{generator} is not a valid maze generator!')
+        self.grid=[]
+        self._goal=(x,y)
+        self.seed=seed
+        self._rng=_seedRng(seed)
+        rows,cols=self.rows,self.cols
+        rowStarts=range(0,rows,tileSize)
+        colStarts=range(0,cols,tileSize)
+        tasks=[]
+        shm=shared_memory.SharedMemory(create=True,size=rows*cols)
+        try:
+            for r0 in rowStarts:
+                for c0 in colStarts:
+                    tasks.append((shm.name,cols,r0,min(r0+tileSize,rows),c0,min(c0+tileSize,cols),generator,self._rng.getrandbits(64)))
+            with Pool(processes) as pool:
+                for _ in pool.imap_unordered(_carveTile,tasks):
+                    pass
+            self._walls=bytearray(shm.buf[:rows*cols])
+        finally:
+            shm.close()
+            shm.unlink()
+        # Random spanning tree of the tiles (Kruskal), one wall opened per tree edge
+        walls=self._walls
+        tc=len(colStarts)
+        parent=list(range(len(tasks)))
+        def find(a):
+            while parent[a]!=a:
+                parent[a]=parent[parent[a]]
+                a=parent[a]
+            return a
+        # (tile,next tile,True for the tile on the East or False for the one on the South)
+        edges=[(t,t+1,True) for t in range(len(tasks)) if t%tc!=tc-1]+[(t,t+tc,False) for t in range(len(tasks)-tc)]
+        self._rng.shuffle(edges)
+        for a,b,east in edges:
+            ra,rb=find(a),find(b)
+            if ra==rb:
+                continue
+            parent[ra]=rb
+            _,_,r0,r1,c0,c1,_,_=tasks[a]
+            if east:
+                i=self._rng.randrange(r0,r1)*cols+c1-1
+                walls[i]|=_E
+                walls[i+1]|=_W
+            else:
+                i=(r1-1)*cols+self._rng.randrange(c0,c1)
+                walls[i]|=_S
+                walls[i+cols]|=_N
+        if loopPercent!=0:
+            self.path=self.pathFrom((rows,cols))
+            self._addLoops(loopPercent)
+            self._wallsChanged()
+        self._path=None
+        self._pathPending=True
+        if self.render:
+            self._attachWindow()
+        agent(self,*self._goal,shape='square',filled=True,color=COLOR.green)
+
+    def _loadCsv(self,filename):
+        '''
+        Load the walls from a CSV maze file.
+        The file is read only once, line by line through a large buffer, and the
+        walls go straight into the wall store. The dimensions are the last cell
+        of the file, found by reading just the end of the file.
+        '''
+        self.rows,self.cols=_csvMazeDims(filename)
+        self.grid=[]
+        walls=self._walls
+        cols=self.cols
+        with open(filename,'r',newline='',buffering=_CSV_BUFFER) as f:
+            next(f)
+            for line in f:
+                # "(x, y)",E,W,N,S
+                q=line.find(')')
+                if q<0:
+                    continue
+                x,y=line[line.index('(')+1:q].split(',')
+                v=line[q+3:].rstrip()
+                b=_CSV_WALLS.get(v)
+                if b is None:
+                    e,w,n,s=v.split(',')
+                    b=int(e)*_E|int(w)*_W|int(n)*_N|int(s)*_S
+                walls[(int(x)-1)*cols+int(y)-1]=b
+
+    def _saveCsv(self,filename):
+        '''
+        Save the walls as a CSV maze file
+        '''
+        with open(filename,'w',newline='') as f:
+            writer=csv.writer(f)
+            writer.writerow(['  cell  ','E','W','N','S'])
+            for k,v in self.maze_map.items():
+                entry=[k]
+                for i in v.values():
+                    entry.append(i)
+                writer.writerow(entry)
+            f.seek(0, os.SEEK_END)
+            f.seek(f.tell()-2, os.SEEK_SET)
+            f.truncate()
+
+    def saveBinary(self,filename):
+        '''
+        Save the maze in the compact binary format: a header with rows, cols,
+        goal and seed followed by the packed wall nibbles (half a byte per cell).
+        The header holds the seed as a signed 64-bit int, other seeds are
+        reduced to one (see _seedInt).
+        '''
+        goal=getattr(self,'_goal',(1,1))
+        flags=0
+        seed=0
+        if self.seed is not None:
+            flags|=_BIN_HAS_SEED
+            seed=_seedInt(self.seed)
+        if isinstance(self._walls,_packedWalls):
+            data=self._walls.packed()
+        else:
+            data=_packNibbles(self._walls)
+        with open(filename,'wb') as f:
+            f.write(_BIN_HEADER.pack(_BIN_MAGIC,_BIN_VERSION,flags,self.rows,self.cols,goal[0],goal[1],seed))
+            f.write(data)
+
+    def loadBinary(self,filename,useMmap=True):
+        '''
+        Load the walls, goal and seed from a binary maze file.
+        useMmap-->  True maps the file into memory (copy on write, the file itself
+                    is never changed) and reads the walls straight from it, so even
+                    a huge maze opens without reading or parsing the cells.
+                    False reads the walls into a normal bytearray store.
+        The path is not computed here, CreateMaze(loadMaze=...) does that.
+        Raises ValueError if the file is shorter than the walls of rows*cols cells.
+        '''
+        with open(filename,'rb') as f:
+            flags,rows,cols,gx,gy,seed=_readBinaryHeader(f,filename)
+            n=rows*cols
+            if useMmap and n>0:
+                buf=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_COPY)
+                walls=_packedWalls(buf,n,_BIN_HEADER.size)
+            else:
+                walls=_unpackNibbles(f.read((n+1)//2),n)
+        self.rows=rows
+        self.cols=cols
+        self._grid=_gridView(self)
+        self._walls=walls
+        self._wallsChanged()
+        self._goal=(gx,gy)
+        self.seed=seed if flags&_BIN_HAS_SEED else None
 
     def _drawMaze(self,theme):
         '''
@@ -620,9 +2158,15 @@ class maze:
         elif self.rows>=22 and self.cols>=22:
             k=3
         self._cell_width=round(min(((scr_height-self.rows-k*self._LabWidth)/(self.rows)),((scr_width-self.cols-k*self._LabWidth)/(self.cols)),90),3)
+        if self.viewport:
+            fit=min((scr_height-3*self._LabWidth)/self.rows,(scr_width-2*self._LabWidth)/self.cols,90)
+            self._setupViewport(fit)
+            return
         
         # Creating Maze lines
-        if self._win is not None:
+        if self._win is not None and self.mergeWalls:
+            self._drawMergedWalls(theme)
+        elif self._win is not None:
             if self.grid is not None:
                 for cell in self.grid:
                     x,y=cell
@@ -638,16 +2182,238 @@ class maze:
                     if self.maze_map[cell]['S']==False:
                         l=self._canvas.create_line(y, x + w, y + w, x + w,width=2,fill=theme.value[1],tag='line')
 
-    def _redrawCell(self,x,y,theme):
+    def _drawMergedWalls(self,theme,r0=0,r1=None,c0=0,c1=None):
+        '''
+        Draw the maze lines with one canvas line per straight run of walls.
+        A wall is drawn if it is closed on either of its two sides, as
+        with the per cell drawing.
+        r0,r1,c0,c1-->  Draw only the walls of the cells in the rows r0 to r1-1
+                        and columns c0 to c1-1 (counted from 0). Default is all.
+        '''
+        rows,cols=self.rows,self.cols
+        if r1 is None:r1=rows
+        if c1 is None:c1=cols
+        walls=self._walls
+        w=self._cell_width
+        L=self._LabWidth
+        line=self._canvas.create_line
+        color=theme.value[1]
+        # Horizontal walls, k is the line between the rows k and k+1
+        for k in range(r0,r1+1):
+            start=None
+            for y in range(c0,c1+1):
+                closed=False
+                if y<c1:
+                    closed=(k>0 and not walls[(k-1)*cols+y]&_S) or (k<rows and not walls[k*cols+y]&_N)
+                if closed and start is None:
+                    start=y
+                elif not closed and start is not None:
+                    line(L+start*w,L+k*w,L+y*w,L+k*w,width=2,fill=color,tag='line')
+                    start=None
+        # Vertical walls, k is the line between the columns k and k+1
+        for k in range(c0,c1+1):
+            start=None
+            for x in range(r0,r1+1):
+                closed=False
+                if x<r1:
+                    closed=(k>0 and not walls[x*cols+k-1]&_E) or (k<cols and not walls[x*cols+k]&_W)
+                if closed and start is None:
+                    start=x
+                elif not closed and start is not None:
+                    line(L+k*w,L+start*w,L+k*w,L+x*w,width=2,fill=color,tag='line')
+                    start=None
+
+    def _setupViewport(self,fit):
+        '''
+        Viewport mode: zoom levels, scroll region and mouse/key bindings.
+        The canvas keeps the normal maze coordinates and is scrolled over them.
+        Cell widths below 2 pixels are 2/k and above are whole numbers, so the
+        zoomed out image of the maze always lines up with the cells.
+        '''
+        k=math.ceil(2/fit) if fit<2 else 1
+        self._zoomLevels=[2/i for i in range(k,1,-1)]+[2]+list(_VIEWPORT_ZOOMS)
+        self._cell_width=max([z for z in self._zoomLevels if z<=fit] or self._zoomLevels[:1])
+        c=self._canvas
+        self._setScrollRegion()
+        c.bind('<ButtonPress-1>',lambda e:c.scan_mark(e.x,e.y))
+        c.bind('<B1-Motion>',self._panViewport)
+        c.bind('<MouseWheel>',lambda e:self._zoomViewport(1 if e.delta>0 else -1,e.x,e.y))
+        c.bind('<Button-4>',lambda e:self._zoomViewport(1,e.x,e.y))
+        c.bind('<Button-5>',lambda e:self._zoomViewport(-1,e.x,e.y))
+        c.bind('<Configure>',lambda e:self._scheduleRender())
+        self._win.bind('<plus>',lambda e:self._zoomViewport(1))
+        self._win.bind('<minus>',lambda e:self._zoomViewport(-1))
+        self._scheduleRender()
+
+    def _setScrollRegion(self):
+        w=self._cell_width
+        L=self._LabWidth
+        self._canvas.config(scrollregion=(0,0,2*L+self.cols*w,2*L+self.rows*w))
+
+    def _scheduleRender(self):
+        '''
+        Render the viewport once the pending events are handled, so a fast drag
+        or zoom renders only once.
+        '''
+        if not self._renderPending:
+            self._renderPending=True
+            self._win.after_idle(self._renderViewport)
+
+    def _panViewport(self,event):
+        self._canvas.scan_dragto(event.x,event.y,gain=1)
+        self._scheduleRender()
+
+    def _zoomViewport(self,steps,px=None,py=None):
+        '''
+        Zoom by steps zoom levels keeping the point (px,py) of the window in place.
+        The agents, footprints and marks are scaled and the walls are re-rendered.
+        '''
+        c=self._canvas
+        levels=self._zoomLevels
+        w=self._cell_width
+        i=min(range(len(levels)),key=lambda j:abs(levels[j]-w))
+        j=max(0,min(len(levels)-1,i+steps))
+        if j==i:
+            return
+        if px is None:
+            px,py=c.winfo_width()/2,c.winfo_height()/2
+        wx,wy=c.canvasx(px),c.canvasy(py)
+        L=self._LabWidth
+        f=levels[j]/w
+        c.delete('line','lod')
+        c.scale('all',L,L,f,f)
+        self._cell_width=levels[j]
+        for a in self._agents:
+            if hasattr(a,'_head'):
+                a._coord=tuple(c.coords(a._head))
+        self._setScrollRegion()
+        width=2*L+self.cols*self._cell_width
+        height=2*L+self.rows*self._cell_width
+        c.xview_moveto(max(0,(L+(wx-L)*f-px)/width))
+        c.yview_moveto(max(0,(L+(wy-L)*f-py)/height))
+        self._scheduleRender()
+
+    def _renderViewport(self):
+        '''
+        Draw the walls of the visible cells only. When zoomed out too far for
+        lines, the visible part is shown as one image made by _raster instead
+        (level of detail), or just the outline if even that is too big.
+        '''
+        self._renderPending=False
+        c=self._canvas
+        w=self._cell_width
+        L=self._LabWidth
+        c.delete('line','lod')
+        left,top=c.canvasx(0),c.canvasy(0)
+        c0=max(0,int((left-L)//w))
+        c1=min(self.cols,int((left+c.winfo_width()-L)//w)+1)
+        r0=max(0,int((top-L)//w))
+        r1=min(self.rows,int((top+c.winfo_height()-L)//w)+1)
+        if r0>=r1 or c0>=c1:
+            return
+        if w>=_VIEWPORT_DETAIL:
+            self._drawMergedWalls(self.theme,r0,r1,c0,c1)
+        else:
+            pitch=max(2,round(w))
+            if ((r1-r0)*pitch+1)*((c1-c0)*pitch+1)>_VIEWPORT_MAX_PIXELS:
+                c.create_rectangle(L,L,L+self.cols*w,L+self.rows*w,outline=self.theme.value[1],width=2,tag='lod')
+                return
+            width,height,pixels=self._raster(pitch-1,1,False,False,False,region=(r0,r1,c0,c1))
+            img=PhotoImage(data=base64.b64encode(_encodePng(width,height,pixels)),format='png')
+            if w<2:
+                img=img.subsample(round(2/w))
+            self._lodImage=img
+            c.create_image(L+c0*w,L+r0*w,image=img,anchor=NW,tag='lod')
+        # The new lines stay above the footprints (filled footprints are kept
+        # just under the lowest line), only the image and the markers move
+        c.tag_lower('lod')
+        c.tag_raise('ov')
+
+    def _attachWindow(self):
+        '''
+        Create the Tkinter window and draw the maze and the agents already
+        placed on it. Does nothing if the window is already there.
+        '''
+        if self._win is not None:
+            return
+        self._drawMaze(self.theme)
+        if self.footprintLayer and not self.viewport:
+            self._createFootprintLayer()
+        for a in self._agents:
+            a.y=a.y
+
+    def _createFootprintLayer(self):
+        '''
+        The transparent image (as big as the maze) on which the footprints are
+        painted, placed under everything else on the canvas.
+        '''
+        L=self._LabWidth
+        w=self._cell_width
+        self._footprintImage=PhotoImage(width=int(2*L+self.cols*w)+1,height=int(2*L+self.rows*w)+1)
+        self._footprintColors={}
+        self._canvas.create_image(0,0,image=self._footprintImage,anchor=NW,tag='fp')
+        self._canvas.tag_lower('fp')
+
+    def _paintFootprint(self,coords,color,arrow=False):
+        '''
+        Paint a footprint in place on the footprint layer. coords are the canvas
+        coordinates of the agent (a rectangle, or the line of an arrow).
+        Returns the (color,rectangle) painted, None if nothing was painted.
+        '''
+        x1,y1,x2,y2=(round(v) for v in coords[:4])
+        x1,x2=min(x1,x2),max(x1,x2)
+        y1,y2=min(y1,y2),max(y1,y2)
+        if arrow:
+            # The arrow is a vertical or horizontal line, paint it 3 pixels thick
+            if x1==x2:
+                x1,x2=x1-1,x2+2
+            else:
+                y1,y2=y1-1,y2+2
+        if x2>x1 and y2>y1:
+            if color not in self._footprintColors:
+                # PhotoImage.put reads a name with spaces ('dim gray') as a list
+                # of colors, so the names are turned into #rrggbb once
+                r,g,b=self._win.winfo_rgb(color)
+                self._footprintColors[color]=f'#{r>>8:02x}{g>>8:02x}{b>>8:02x}'
+            color=self._footprintColors[color]
+            rect=(max(0,x1),max(0,y1),x2,y2)
+            self._footprintImage.put(color,to=rect)
+            return color,rect
+
+    def _clearFootprints(self,a):
+        '''
+        Remove the footprints of the agent a from the footprint layer. The image
+        is cleared and the footprints of the other agents are painted again.
+        '''
+        if not a._layerPrints:
+            return
+        a._layerPrints=[]
+        self._footprintImage.blank()
+        for other in self._agents:
+            for color,rect in other._layerPrints:
+                self._footprintImage.put(color,to=rect)
+    def _redrawCell(self,x,y,theme,items=None):
         '''
         To redraw a cell.
         With Full sized square agent, it can overlap with maze lines
         So the cell is redrawn so that cell lines are on top
+        items-->    A list of four lines (E,W,N,S) to reuse for the walls, the
+                    lines are created on the first call if the list is empty.
+                    Without it, new lines are created every time.
         '''
         w=self._cell_width
         cell=(x,y)
         x=x*w-w+self._LabWidth
         y=y*w-w+self._LabWidth
+        if items is not None:
+            if not items:
+                items.extend(self._canvas.create_line(0,0,0,0,width=2,fill=theme.value[1]) for d in 'EWNS')
+            sides=((y + w, x, y + w, x + w),(y, x, y, x + w),(y, x, y + w, x),(y, x + w, y + w, x + w))
+            for item,d,coords in zip(items,'EWNS',sides):
+                self._canvas.coords(item,*coords)
+                self._canvas.itemconfig(item,state='hidden' if self.maze_map[cell][d] else 'normal')
+                self._canvas.tag_raise(item)
+            return
         if self.maze_map[cell]['E']==False:
             self._canvas.create_line(y + w, x, y + w, x + w,width=2,fill=theme.value[1])
         if self.maze_map[cell]['W']==False:
@@ -661,6 +2427,7 @@ class maze:
         '''
         To control an agent a with Arrow Keys
         '''
+        self._attachWindow()
         self._win.bind('<Left>',a.moveLeft)
         self._win.bind('<Right>',a.moveRight)
         self._win.bind('<Up>',a.moveUp)
@@ -670,6 +2437,7 @@ class maze:
         '''
         To control an agent a with keys W,A,S,D
         '''
+        self._attachWindow()
         self._win.bind('<a>',a.moveLeft)
         self._win.bind('<d>',a.moveRight)
         self._win.bind('<w>',a.moveUp)
@@ -677,113 +2445,160 @@ class maze:
 
 
 
-    _tracePathList=[]
-    def _tracePathSingle(self,a,p,kill,showMarked,delay):
+    def _raster(self,cellSize=4,wallSize=1,showPath=True,showAgents=True,showMarked=True,pathColor='tomato',region=None):
         '''
-        An interal method to help tracePath method for tracing a path by agent.
+        Draw the maze into an RGB pixel buffer, straight from the wall store
+        and without Tkinter. Every cell is cellSize pixels with wallSize pixel
+        lines between the cells. All the pixel rows inside one maze row are the
+        same, so each of them is built once (by joining per cell pieces) and
+        repeated. The path from (rows,cols) to the goal, the agents with their
+        footprints and the marked cells are painted on top.
+        region-->   (r0,r1,c0,c1) to draw only the cells in the rows r0 to r1-1
+                    and columns c0 to c1-1 (counted from 0)
+        Returns width,height,pixels.
         '''
-        
-        def killAgent(a):
-            '''
-            if the agent should be killed after it reaches the Goal or completes the path
-            '''
-            for i in range(len(a._body)):
-                self._canvas.delete(a._body[i])
-            self._canvas.delete(a._head) 
-        w=self._cell_width
+        rows,cols=self.rows,self.cols
+        r0,r1,c0,c1=region if region is not None else (0,rows,0,cols)
+        walls=self._walls
+        theme=getattr(self,'theme',COLOR.dark)
+        bg=_rgb(theme.value[0])
+        fg=_rgb(theme.value[1])
+        cs,ws=cellSize,wallSize
+        P=cs+ws
+        width=(c1-c0)*P+ws
+        height=(r1-r0)*P+ws
+        post=fg*ws
+        hClosed,hOpen=post+fg*cs,post+bg*cs
+        vClosed,vOpen=fg*ws+bg*cs,bg*P
+        pixels=bytearray()
+        for x in range(r0,r1):
+            base=x*cols
+            # Line above the row x (walls drawn if closed on either side)
+            line=b''.join([hOpen if walls[base+y]&_N and (x==0 or walls[base-cols+y]&_S) else hClosed for y in range(c0,c1)])
+            pixels+=(line+post)*ws
+            line=b''.join([vOpen if walls[base+y]&_W and (y==0 or walls[base+y-1]&_E) else vClosed for y in range(c0,c1)])
+            last=base+c1-1
+            opened=walls[last]&_E and (c1==cols or walls[last+1]&_W)
+            pixels+=(line+(bg*ws if opened else post))*cs
+        base=(r1-1)*cols
+        line=b''.join([hOpen if walls[base+y]&_S and (r1==rows or walls[base+cols+y]&_N) else hClosed for y in range(c0,c1)])
+        pixels+=(line+post)*ws
+
+        stride=width*3
+        def fill(left,top,w,h,color):
+            row=color*w
+            for r in range(top,top+h):
+                pixels[r*stride+left*3:r*stride+(left+w)*3]=row
+        def inside(cell):
+            return r0<cell[0]<=r1 and c0<cell[1]<=c1
+        def fillCell(cell,color,size=cs):
+            if inside(cell):
+                off=(cs-size)//2
+                fill(ws+(cell[1]-1-c0)*P+off,ws+(cell[0]-1-r0)*P+off,size,size,color)
+
+        if showPath:
+            color=_rgb(pathColor)
+            cell=(rows,cols)
+            goal=getattr(self,'_goal',(1,1))
+            seen=set()
+            while cell not in seen:
+                seen.add(cell)
+                fillCell(cell,color)
+                if cell==goal or cell not in self.path:
+                    break
+                nxt=self.path[cell]
+                # Fill the gap of the open wall between the two cells
+                if inside(cell) and inside(nxt):
+                    top,left=min(cell[0],nxt[0])-r0,min(cell[1],nxt[1])-c0
+                    if cell[0]==nxt[0]:
+                        fill(left*P,ws+(top-1)*P,ws,cs,color)
+                    else:
+                        fill(ws+(left-1)*P,top*P,cs,ws,color)
+                cell=nxt
+        if showAgents:
+            for a in self._agents:
+                size=cs if a.filled or a.shape=='arrow' else max(1,cs//2)
+                if a.footprints:
+                    color=_rgb(a.color.value[1])
+                    for cell in a._visited:
+                        fillCell(cell,color,size)
+                fillCell(a.position,_rgb(a.color.value[0]),size)
+        if showMarked:
+            color=_rgb('red')
+            for cell in self.markCells:
+                fillCell(cell,color,max(1,cs//4))
+        return width,height,pixels
+
+    def saveImage(self,filename,cellSize=4,wallSize=1,showPath=True,showAgents=True,showMarked=True,pathColor='tomato'):
+        '''
+        Save a picture of the maze as a PNG (.png) or PPM (.ppm) file.
+        Works for headless mazes and for mazes far too big to draw with Tkinter.
+        cellSize,wallSize-->    Size of the cells and of the wall lines in pixels
+        showPath-->     Paint the path from (rows,cols) to the goal with pathColor
+        showAgents-->   Paint the agents and their footprints
+        showMarked-->   Paint the markCells
+        '''
+        ext=os.path.splitext(filename)[1].lower()
+        if ext not in ('.png','.ppm'):
+            raise ValueError(f'{filename} must be a .png or .ppm file!')
+        width,height,pixels=self._raster(cellSize,wallSize,showPath,showAgents,showMarked,pathColor)
+        encode=_encodePng if ext=='.png' else _encodePpm
+        with open(filename,'wb') as f:
+            f.write(encode(width,height,pixels))
+
+    def _killAgent(self,a):
+        '''
+        if the agent should be killed after it reaches the Goal or completes the path
+        '''
+        for i in range(len(a._body)):
+            self._canvas.delete(a._body[i])
+        for i in a._wallItems:
+            self._canvas.delete(i)
+        self._canvas.delete(a._head)
+        if self._footprintImage is not None:
+            self._clearFootprints(a)
+
+    def _turnAgent(self,a,mov):
+        '''
+        Turn an arrow agent one step towards the direction mov (0 N, 1 E, 2 S, 3 W).
+        Returns True if it was already facing that way (so it can move).
+        '''
+        o=a._orient
+        if mov==o:
+            return True
+        if mov-o in (2,-2,1,-3):
+            a._RCW()
+        else:
+            a._RCCW()
+        return False
+
+    def _traceStep(self,t):
+        '''
+        One step of an agent tracing its path: a move (or a turn for an arrow agent).
+        t is the trace state [agent,path,position in path,showMarked]. Strings and
+        lists are followed by position and dictionaries by the agent cell, so the
+        path is never copied or changed.
+        Returns False when the agent has finished its path.
+        '''
+        a,p,pos,showMarked=t
         if((a.x,a.y) in self.markCells and showMarked):
             w=self._cell_width
             x=a.x*w-w+self._LabWidth
             y=a.y*w-w+self._LabWidth
             self._canvas.create_oval(y + w/2.5+w/20, x + w/2.5+w/20,y + w/2.5 +w/4-w/20, x + w/2.5 +w/4-w/20,fill='red',outline='red',tag='ov')
             self._canvas.tag_raise('ov')
-       
         if (a.x,a.y)==(a.goal):
-            del maze._tracePathList[0][0][a]
-            if maze._tracePathList[0][0]=={}:
-                del maze._tracePathList[0]
-                if len(maze._tracePathList)>0:
-                    self.tracePath(maze._tracePathList[0][0],kill=maze._tracePathList[0][1],delay=maze._tracePathList[0][2])
-            if kill:
-                self._win.after(300, killAgent,a)         
-            return
-        # If path is provided as Dictionary
-        if(type(p)==dict):
-            if(len(p)==0):
-                del maze._tracePathList[0][0][a]
-                return
-            if a.shape=='arrow':
-                old=(a.x,a.y)
-                new=p[(a.x,a.y)]
-                o=a._orient
-                
-                if old!=new:
-                    if old[0]==new[0]:
-                        if old[1]>new[1]:
-                            mov=3#'W' #3
-                        else:
-                            mov=1#'E' #1
-                    else:
-                        if old[0]>new[0]:
-                            mov=0#'N' #0
-
-                        else:
-                            mov=2#'S' #2
-                    if mov-o==2:
-                        a._RCW()
-
-                    if mov-o==-2:
-                        a._RCW()
-                    if mov-o==1:
-                        a._RCW()
-                    if mov-o==-1:
-                        a._RCCW()
-                    if mov-o==3:
-                        a._RCCW()
-                    if mov-o==-3:
-                        a._RCW()
-                    if mov==o:
-                        a.x,a.y=p[(a.x,a.y)]
-                else:
-                    del p[(a.x,a.y)]
-            else:    
-                a.x,a.y=p[(a.x,a.y)]
+            return False
         # If path is provided as String
-        if (type(p)==str):
-            if(len(p)==0):
-                del maze._tracePathList[0][0][a]
-                if maze._tracePathList[0][0]=={}:
-                    del maze._tracePathList[0]
-                    if len(maze._tracePathList)>0:
-                        self.tracePath(maze._tracePathList[0][0],kill=maze._tracePathList[0][1],delay=maze._tracePathList[0][2])
-                if kill:
-                    
-                    self._win.after(300, killAgent,a)         
-                return
-            if a.shape=='arrow':
-                old=(a.x,a.y)
-                new=p[0]
-                o=a._orient
-                if new=='N': mov=0
-                elif new=='E': mov=1
-                elif new=='S': mov=2
-                elif new=='W': mov=3
-                
-                if mov-o==2:
-                    a._RCW()
-
-                if mov-o==-2:
-                    a._RCW()
-                if mov-o==1:
-                    a._RCW()
-                if mov-o==-1:
-                    a._RCCW()
-                if mov-o==3:
-                    a._RCCW()
-                if mov-o==-3:
-                    a._RCW()
-            if a.shape=='square' or mov==o:    
-                move=p[0]
+        if isinstance(p,str):
+            if pos>=len(p):
+                return False
+            move=p[pos]
+            if move=='C':
+                a._RCW()
+            elif move=='A':
+                a._RCCW()
+            elif a.shape=='square' or self._turnAgent(a,'NESW'.index(move)):
                 if move=='E':
                     if a.y+1<=self.cols:
                         a.y+=1
@@ -798,75 +2613,103 @@ class maze:
                     if a.x+1<=self.rows:
                         a.x+=1
                         a.y=a.y
-                elif move=='C':
-                    a._RCW()
-                elif move=='A':
-                    a._RCCW()
-                p=p[1:]
-        # If path is provided as List
-        if (type(p)==list):
-            if(len(p)==0):
-                del maze._tracePathList[0][0][a]
-                if maze._tracePathList[0][0]=={}:
-                    del maze._tracePathList[0]
-                    if len(maze._tracePathList)>0:
-                        self.tracePath(maze._tracePathList[0][0],kill=maze._tracePathList[0][1],delay=maze._tracePathList[0][2])
-                if kill:                    
-                    self._win.after(300, killAgent,a)  
-                return
-            if a.shape=='arrow':
-                old=(a.x,a.y)
-                new=p[0]
-                o=a._orient
-                
-                if old!=new:
-                    if old[0]==new[0]:
-                        if old[1]>new[1]:
-                            mov=3#'W' #3
-                        else:
-                            mov=1#'E' #1
-                    else:
-                        if old[0]>new[0]:
-                            mov=0#'N' #0
-
-                        else:
-                            mov=2#'S' #2
-                    if mov-o==2:
-                        a._RCW()
-
-                    elif mov-o==-2:
-                        a._RCW()
-                    elif mov-o==1:
-                        a._RCW()
-                    elif mov-o==-1:
-                        a._RCCW()
-                    elif mov-o==3:
-                        a._RCCW()
-                    elif mov-o==-3:
-                        a._RCW()
-                    elif mov==o:
-                        a.x,a.y=p[0]
-                        del p[0]
-                else:
-                    del p[0]
-            else:    
-                a.x,a.y=p[0]
-                del p[0]
+            else:
+                return True
+            t[2]=pos+1
+            return True
+        # If path is provided as Dictionary or List
+        old=(a.x,a.y)
+        if isinstance(p,list):
+            if pos>=len(p):
+                return False
+            new=p[pos]
+        else:
+            if old not in p:
+                return False
+            new=p[old]
+        if old==new:
+            t[2]=pos+1
+            return isinstance(p,list)
+        if a.shape=='arrow':
+            if old[0]==new[0]:
+                mov=3 if old[1]>new[1] else 1 # W E
+            else:
+                mov=0 if old[0]>new[0] else 2 # N S
+            if not self._turnAgent(a,mov):
+                return True
+        a.x,a.y=new
+        t[2]=pos+1
+        return True
+
+    def _traceTick(self):
+        '''
+        The single animation clock of the maze. Every tick advances all the
+        agents of the current tracePath call by the steps of one frame, so there
+        is only one pending Tkinter callback however many agents are moving.
+        '''
+        self._traceAfter=None
+        traces,kill,showMarked,delay,stepsPerFrame=self._traceQueue[0]
+        for t in list(traces):
+            for _ in range(stepsPerFrame):
+                if not self._traceStep(t):
+                    traces.remove(t)
+                    if kill:
+                        self._win.after(300,self._killAgent,t[0])
+                    break
+        if traces:
+            self._traceAfter=self._win.after(delay,self._traceTick)
+        else:
+            self._traceQueue.popleft()
+            self._startTrace()
 
-        self._win.after(delay, self._tracePathSingle,a,p,kill,showMarked,delay)    
+    def _startTrace(self):
+        '''
+        Start the oldest queued tracePath call, if nothing is being traced.
+        '''
+        while self._traceQueue and self._traceAfter is None:
+            traces=self._traceQueue[0][0]
+            if traces:
+                self._traceTick()
+            else:
+                self._traceQueue.popleft()
 
-    def tracePath(self,d,kill=False,delay=300,showMarked=False):
+    def tracePath(self,d,kill=False,delay=300,showMarked=False,duration=None,stepsPerFrame=1):
         '''
         A method to trace path by agent
         You can provide more than one agent/path details
+        The paths can be dictionaries, lists of cells, strings of moves (NESW)
+        or movePaths. A movePath is followed through its moves string from
+        where the agent is on it, without copying it.
+        If tracePath is called again before the agents finish, the new call
+        starts when the previous one is over.
+        delay-->    Milliseconds between two frames
+        stepsPerFrame-->    Number of steps every agent makes in one frame
+        duration--> Target time (in seconds) for the whole trace. If given,
+                    stepsPerFrame is chosen so the longest path takes about
+                    that long, skipping the frames in between.
         '''
-        self._tracePathList.append((d,kill,delay))
-        if maze._tracePathList[0][0]==d: 
-            for a,p in d.items():
-                if a.goal!=(a.x,a.y) and len(p)!=0:
-                    self._tracePathSingle(a,p,kill,showMarked,delay)
+        self._attachWindow()
+        traces=[]
+        longest=0
+        for a,p in d.items():
+            pos=0
+            if isinstance(p,movePath):
+                pos=p._find((a.x,a.y))
+                if pos<0:
+                    continue
+                p=p.moves
+            if a.goal!=(a.x,a.y) and len(p)!=pos:
+                traces.append([a,p,pos,showMarked])
+                longest=max(longest,len(p)-pos)
+        if duration is not None:
+            frames=max(1,int(duration*1000/max(delay,1)))
+            stepsPerFrame=max(1,-(-longest//frames))
+        self._traceQueue.append((traces,kill,showMarked,delay,max(1,stepsPerFrame)))
+        self._startTrace()
+
     def run(self):
         '''
         Finally to run the Tkinter Main Loop
         '''
+        self._attachWindow()
         self._win.mainloop()
\ No newline at end of file
@@ -0,0 +1,33 @@
+import unittest
+from pyMaze import maze
+
+class TestTiledMaze(unittest.TestCase):
+    '''
+    CreateTiledMaze must give a perfect maze whatever the shape of the tile grid
+    '''
+    def assertPerfect(self,m):
+        n=m.rows*m.cols
+        passages=sum(len(m.neighbors(i)) for i in range(n))//2
+        self.assertEqual(passages,n-1)
+        self.assertEqual(m.distanceField()[0].count(-1),0)
+        self.assertEqual(len(m.path),m.goalDistance((m.rows,m.cols)))
+
+    def test_tileGrids(self):
+        # 1xN, Nx1 and NxM tile grids, with tiles of 16x16 cells
+        for rows,cols in ((10,40),(40,10),(40,45),(16,16)):
+            for generator in ('backtracker','kruskal','wilson'):
+                with self.subTest(rows=rows,cols=cols,generator=generator):
+                    m=maze(rows,cols,render=False)
+                    m.CreateTiledMaze(generator=generator,seed=3,tileSize=16,processes=2)
+                    self.assertPerfect(m)
+
+    def test_loops(self):
+        for rows,cols in ((10,40),(40,10),(40,45)):
+            with self.subTest(rows=rows,cols=cols):
+                m=maze(rows,cols,render=False)
+                m.CreateTiledMaze(loopPercent=50,seed=3,tileSize=16,processes=2)
+                self.assertEqual(m.distanceField()[0].count(-1),0)
+                self.assertEqual(len(m.path),m.goalDistance((rows,cols)))
+
+if __name__=='__main__':
+    unittest.main()